@@ -0,0 +1,326 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Benchmark start, grade and finish of the DO370 labs against a fake API.
+
+    python -m benchmarks.bench                      # every lab
+    python -m benchmarks.bench backup-review --latency 0.02
+    python -m benchmarks.bench --update-baseline
+
+For every lab a fresh benchmarks.fakeapi server is started in this process
+and the lab runs in a child process, with an empty cache directory, so that
+module level state and on-disk caches do not leak from one lab to the next.
+The child builds the lab object without logging in, points its dynamic
+client at the fake server and replaces the steps that need real machines:
+run_playbook and the labtools host and file helpers succeed immediately and
+are counted as "playbooks".
+
+Each phase records wall time, API requests and bytes transferred, and the
+labels of its Console items that failed. A phase fails when one of its
+items fails, when it raises or exits with an error, when it makes more
+requests than its baseline in benchmarks/baseline.json, or when its time or
+traffic grows by more than --tolerance. A lab or phase without a baseline
+fails too, and --update-baseline does not write a baseline while any phase
+fails.
+
+The baseline needs the lab dependencies (labs.common, ocp and kubernetes),
+so it is not part of the repository. Until it exists every comparison run
+exits with status 1. Generate it from the repository root, on the machine
+that runs the comparisons, and commit it:
+
+    python -m benchmarks.bench --update-baseline
+    git add benchmarks/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import subprocess
+import urllib.request
+
+from benchmarks.fakeapi import FakeAPIServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+PHASES = ("start", "grade", "finish")
+
+# Modules of the do370 package that are not labs
+_NOT_LABS = ("__init__", "version")
+
+# Allowed relative growth of time and bytes before a phase fails
+TOLERANCE = 0.25
+
+# Absolute time difference always tolerated, in seconds
+_TIME_SLACK = 0.05
+
+
+def labs():
+    """
+    Return the names of the lab modules
+    """
+    names = []
+    for filename in sorted(os.listdir(os.path.join(ROOT, "do370"))):
+        name, ext = os.path.splitext(filename)
+        if ext == ".py" and name not in _NOT_LABS:
+            names.append(name)
+    return names
+
+
+def _stats(url, action):
+    with urllib.request.urlopen("{}/_bench/{}".format(url, action)) as response:
+        return json.load(response)
+
+
+# Child process
+
+def _stand_ins(counters):
+    from labs.common import labtools, userinterface
+
+    def succeed(item):
+        counters["playbooks"] += 1
+        item["failed"] = False
+        return item["failed"]
+
+    for name in ("check_host_reachable", "copy_lab_files", "delete_workdir"):
+        setattr(labtools, name, succeed)
+
+    # Record the items of every Console, do370.common.executor included
+    init = userinterface.Console.__init__
+
+    def record(self, items, *args, **kwargs):
+        if not any(seen is items for seen in counters["items"]):
+            counters["items"].append(items)
+        init(self, items, *args, **kwargs)
+
+    userinterface.Console.__init__ = record
+    return succeed
+
+
+def _failed_items(counters):
+    return [
+        item.get("label", "?")
+        for items in counters["items"] for item in items
+        if item.get("failed") or item.get("exception")
+    ]
+
+
+def _client(url):
+    from kubernetes import client
+    try:
+        from openshift.dynamic import DynamicClient
+    except ImportError:
+        from kubernetes.dynamic import DynamicClient
+    configuration = client.Configuration()
+    configuration.host = url
+    return DynamicClient(client.ApiClient(configuration))
+
+
+def _run_lab(lab_name, url, result_path):
+    from do370.common import fleet, session
+
+    counters = {"playbooks": 0, "items": []}
+    succeed = _stand_ins(counters)
+    module = importlib.import_module("do370.{}".format(lab_name))
+    cls = fleet.lab_class(module, lab_name)
+    lab = cls.__new__(cls)
+    lab.oc_client = _client(url)
+    session.use(lab)
+    lab.run_playbook = succeed
+
+    results = {}
+    for phase in PHASES:
+        if not callable(vars(cls).get(phase)):
+            continue
+        _stats(url, "reset")
+        counters["playbooks"] = 0
+        counters["items"] = []
+        start = time.perf_counter()
+        error = None
+        try:
+            getattr(lab, phase)()
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = "SystemExit: {}".format(e.code)
+        except Exception as e:
+            error = "{}: {}".format(e.__class__.__name__, e)
+        seconds = time.perf_counter() - start
+        stats = _stats(url, "stats")
+        results[phase] = {
+            "seconds": round(seconds, 4),
+            "requests": stats["requests"],
+            "bytes": stats["bytes_in"] + stats["bytes_out"],
+            "by_verb": stats["by_verb"],
+            "playbooks": counters["playbooks"],
+            "failed_items": _failed_items(counters),
+            "error": error,
+        }
+    with open(result_path, "w") as output_file:
+        json.dump(results, output_file)
+
+
+# Parent process
+
+def bench_lab(lab_name, latency, timeout):
+    """
+    Run lab_name against a new fake API server, return its phase results
+    """
+    server = FakeAPIServer(latency=latency)
+    url = server.start()
+    fd, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        with tempfile.TemporaryDirectory() as cache_home:
+            env = dict(os.environ, XDG_CACHE_HOME=cache_home, HOME=cache_home)
+            env["PYTHONPATH"] = os.pathsep.join(
+                filter(None, [ROOT, os.environ.get("PYTHONPATH")])
+            )
+            process = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench", lab_name,
+                 "--worker", url, result_path],
+                env=env,
+                cwd=ROOT,
+                timeout=timeout,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            )
+        try:
+            with open(result_path) as input_file:
+                return json.load(input_file)
+        except (OSError, ValueError):
+            lines = process.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else "exit status {}".format(
+                process.returncode))
+    finally:
+        os.remove(result_path)
+        server.stop()
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of regression messages
+    """
+    regressions = []
+    for lab_name, phases in sorted(results.items()):
+        for phase, current in sorted(phases.items()):
+            label = "{} {}".format(lab_name, phase)
+            base = baseline.get(lab_name, {}).get(phase)
+            if base is None:
+                regressions.append("{}: no baseline".format(label))
+                continue
+            if current["requests"] > base["requests"]:
+                regressions.append("{}: {} requests, baseline {}".format(
+                    label, current["requests"], base["requests"]))
+            if current["seconds"] > base["seconds"] * (1 + tolerance) + _TIME_SLACK:
+                regressions.append("{}: {:.3f}s, baseline {:.3f}s".format(
+                    label, current["seconds"], base["seconds"]))
+            if current["bytes"] > base["bytes"] * (1 + tolerance):
+                regressions.append("{}: {} bytes, baseline {}".format(
+                    label, current["bytes"], base["bytes"]))
+    return regressions
+
+
+def phase_failures(results):
+    """
+    Return a message for every phase that raised or has failed items
+    """
+    failures = []
+    for lab_name, phases in sorted(results.items()):
+        for phase, result in sorted(phases.items()):
+            label = "{} {}".format(lab_name, phase)
+            if result["error"]:
+                failures.append("{}: {}".format(label, result["error"]))
+            if result.get("failed_items"):
+                failures.append("{}: failed items: {}".format(
+                    label, ", ".join(result["failed_items"])))
+    return failures
+
+
+def _print_table(results):
+    print("{:<24} {:<7} {:>9} {:>9} {:>11} {:>10}".format(
+        "lab", "phase", "seconds", "requests", "bytes", "playbooks"))
+    for lab_name, phases in sorted(results.items()):
+        for phase in PHASES:
+            if phase not in phases:
+                continue
+            result = phases[phase]
+            print("{:<24} {:<7} {:>9.3f} {:>9} {:>11} {:>10}{}".format(
+                lab_name, phase, result["seconds"], result["requests"],
+                result["bytes"], result["playbooks"],
+                "  ERROR: " + result["error"] if result["error"] else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench",
+        description="Benchmark the DO370 labs against a fake API server",
+    )
+    parser.add_argument("labs", nargs="*", help="labs to run (default: all)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every API request")
+    parser.add_argument("--timeout", type=int, default=600,
+                        help="time limit per lab, in seconds")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed relative growth of time and bytes")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--worker", nargs=2, metavar=("URL", "RESULT"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _run_lab(args.labs[0], *args.worker)
+        return 0
+
+    results = {}
+    failures = []
+    for lab_name in args.labs or labs():
+        try:
+            results[lab_name] = bench_lab(lab_name, args.latency, args.timeout)
+        except Exception as e:
+            failures.append("{}: {}".format(lab_name, e))
+    failures.extend(phase_failures(results))
+    _print_table(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    for failure in failures:
+        print("FAILED {}".format(failure))
+    if args.update_baseline:
+        if failures:
+            print("Baseline not written, some labs failed")
+            return 1
+        with open(args.baseline, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+        print("Baseline written to {}".format(args.baseline))
+        return 0
+
+    try:
+        with open(args.baseline) as input_file:
+            baseline = json.load(input_file)
+    except OSError:
+        print("No baseline in {}, run with --update-baseline".format(args.baseline))
+        return 1
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print("REGRESSION {}".format(regression))
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
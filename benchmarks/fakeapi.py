@@ -0,0 +1,846 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+In-process stand-in for the Kubernetes/OpenShift API used by the benchmarks.
+
+FakeAPIServer serves, over plain HTTP on 127.0.0.1:
+
+    /version, /api, /apis and the resource lists of every group in KINDS
+    /readyz, /healthz and /livez, which always answer "ok"
+    GET (single object and list), POST, PUT, PATCH (server-side apply and
+    merge patches) and DELETE on the kinds in KINDS
+    limit and continue on lists, and PartialObjectMetadata(List) responses
+    when the Accept header asks for them
+    watch=true streams with resourceVersion, fieldSelector and labelSelector
+
+Objects are stored in memory. Created objects are reconciled immediately:
+Pods are Running, PVCs and ObjectBucketClaims are Bound, VolumeSnapshots are
+ready to use, Deployments are available and Jobs are complete. A Bound
+ObjectBucketClaim gets its ConfigMap and Secret, a VolumeSnapshot gets a
+VolumeSnapshotContent that is deleted with it, and deleting a Namespace or
+Project deletes the objects it contains, after keeping it Terminating for
+terminating seconds when that delay is set. Server-side apply creates missing
+objects, except Projects, which have to be created. The stringData of Secrets
+is stored base64 encoded in data.
+
+Every request sleeps for latency seconds before it is handled, and is
+counted in stats with the size of the request and response bodies. The
+special paths /_bench/stats and /_bench/reset read and reset these counters
+and are not counted themselves.
+"""
+
+import re
+import copy
+import json
+import time
+import uuid
+import base64
+import threading
+import datetime
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# group, version, kind, plural, namespaced
+KINDS = [
+    ("", "v1", "Namespace", "namespaces", False),
+    ("", "v1", "Node", "nodes", False),
+    ("", "v1", "Pod", "pods", True),
+    ("", "v1", "PersistentVolumeClaim", "persistentvolumeclaims", True),
+    ("", "v1", "PersistentVolume", "persistentvolumes", False),
+    ("", "v1", "ConfigMap", "configmaps", True),
+    ("", "v1", "Secret", "secrets", True),
+    ("", "v1", "Service", "services", True),
+    ("", "v1", "ServiceAccount", "serviceaccounts", True),
+    ("", "v1", "ResourceQuota", "resourcequotas", True),
+    ("", "v1", "LimitRange", "limitranges", True),
+    ("", "v1", "Event", "events", True),
+    ("rbac.authorization.k8s.io", "v1", "ClusterRole", "clusterroles", False),
+    ("rbac.authorization.k8s.io", "v1", "ClusterRoleBinding", "clusterrolebindings", False),
+    ("rbac.authorization.k8s.io", "v1", "Role", "roles", True),
+    ("rbac.authorization.k8s.io", "v1", "RoleBinding", "rolebindings", True),
+    ("apps", "v1", "Deployment", "deployments", True),
+    ("apps", "v1", "StatefulSet", "statefulsets", True),
+    ("batch", "v1", "Job", "jobs", True),
+    ("storage.k8s.io", "v1", "StorageClass", "storageclasses", False),
+    ("snapshot.storage.k8s.io", "v1", "VolumeSnapshot", "volumesnapshots", True),
+    ("snapshot.storage.k8s.io", "v1", "VolumeSnapshotClass", "volumesnapshotclasses", False),
+    ("snapshot.storage.k8s.io", "v1", "VolumeSnapshotContent", "volumesnapshotcontents", False),
+    ("snapshot.storage.k8s.io", "v1beta1", "VolumeSnapshotClass", "volumesnapshotclasses", False),
+    ("project.openshift.io", "v1", "Project", "projects", False),
+    ("route.openshift.io", "v1", "Route", "routes", True),
+    ("template.openshift.io", "v1", "Template", "templates", True),
+    ("config.openshift.io", "v1", "ClusterVersion", "clusterversions", False),
+    ("config.openshift.io", "v1", "ClusterOperator", "clusteroperators", False),
+    ("quota.openshift.io", "v1", "ClusterResourceQuota", "clusterresourcequotas", False),
+    ("imageregistry.operator.openshift.io", "v1", "Config", "configs", False),
+    ("objectbucket.io", "v1alpha1", "ObjectBucketClaim", "objectbucketclaims", True),
+    ("objectbucket.io", "v1alpha1", "ObjectBucket", "objectbuckets", False),
+    ("local.storage.openshift.io", "v1alpha1", "LocalVolumeSet", "localvolumesets", True),
+    ("local.storage.openshift.io", "v1alpha1", "LocalVolumeDiscovery", "localvolumediscoveries", True),
+    ("local.storage.openshift.io", "v1", "LocalVolume", "localvolumes", True),
+    ("ocs.openshift.io", "v1", "StorageCluster", "storageclusters", True),
+    ("operators.coreos.com", "v1alpha1", "ClusterServiceVersion", "clusterserviceversions", True),
+    ("operators.coreos.com", "v1alpha1", "Subscription", "subscriptions", True),
+    ("operators.coreos.com", "v1", "OperatorGroup", "operatorgroups", True),
+    ("operators.coreos.com", "v1alpha2", "OperatorGroup", "operatorgroups", True),
+    ("konveyor.openshift.io", "v1alpha1", "Velero", "veleros", True),
+    ("velero.io", "v1", "Backup", "backups", True),
+    ("velero.io", "v1", "Restore", "restores", True),
+]
+
+VERBS = ["create", "delete", "get", "list", "patch", "update", "watch"]
+
+CLUSTER_ID = "00000000-0000-0000-0000-000000000370"
+
+SEED = [
+    {"apiVersion": "config.openshift.io/v1", "kind": "ClusterVersion",
+     "metadata": {"name": "version"},
+     "spec": {"clusterID": CLUSTER_ID},
+     "status": {"desired": {"version": "4.10.0"}}},
+    {"apiVersion": "v1", "kind": "Node", "metadata": {"name": "master01"}},
+    {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": "default"}},
+    {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": "openshift"}},
+    {"apiVersion": "v1", "kind": "Namespace",
+     "metadata": {"name": "openshift-storage"}},
+    {"apiVersion": "storage.k8s.io/v1", "kind": "StorageClass",
+     "metadata": {"name": "ocs-storagecluster-ceph-rbd"},
+     "provisioner": "openshift-storage.rbd.csi.ceph.com"},
+    {"apiVersion": "storage.k8s.io/v1", "kind": "StorageClass",
+     "metadata": {"name": "ocs-storagecluster-cephfs"},
+     "provisioner": "openshift-storage.cephfs.csi.ceph.com"},
+    {"apiVersion": "storage.k8s.io/v1", "kind": "StorageClass",
+     "metadata": {"name": "ocs-storagecluster-ceph-rgw"},
+     "provisioner": "openshift-storage.ceph.rook.io/bucket"},
+    {"apiVersion": "snapshot.storage.k8s.io/v1", "kind": "VolumeSnapshotClass",
+     "metadata": {"name": "ocs-storagecluster-rbdplugin-snapclass"},
+     "driver": "openshift-storage.rbd.csi.ceph.com"},
+    {"apiVersion": "route.openshift.io/v1", "kind": "Route",
+     "metadata": {"name": "ocs-storagecluster-cephobjectstore",
+                  "namespace": "openshift-storage"},
+     "spec": {"host": "ocs-storagecluster-cephobjectstore-openshift-storage"
+                      ".apps.ocp4.example.com"}},
+]
+
+
+class _Kind:
+    def __init__(self, group, version, kind, plural, namespaced):
+        self.group = group
+        self.version = version
+        self.kind = kind
+        self.plural = plural
+        self.namespaced = namespaced
+
+    @property
+    def api_version(self):
+        return "{}/{}".format(self.group, self.version) if self.group else self.version
+
+
+class ApiError(Exception):
+    def __init__(self, code, reason, message):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+
+
+def _version_order(version):
+    """
+    Sort key of API versions: GA before beta before alpha, newest first
+    """
+    match = re.match(r"v(\d+)(?:(alpha|beta)(\d+))?$", version)
+    if match is None:
+        return (0, 0, 0)
+    major, stage, minor = match.groups()
+    return ({None: 3, "beta": 2, "alpha": 1}[stage], int(major), int(minor or 0))
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _merge(target, patch):
+    """
+    JSON merge patch (RFC 7386), also used for apply and strategic merges
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = _merge(target.get(key), value)
+    return target
+
+
+def _selector(value):
+    """
+    Parse "a=b,c=d" into a dictionary, "==" is accepted as well
+    """
+    result = {}
+    for term in filter(None, (value or "").split(",")):
+        key, _, expected = term.replace("==", "=").partition("=")
+        result[key.strip()] = expected.strip()
+    return result
+
+
+def _matches(obj, fields, labels):
+    metadata = obj.get("metadata", {})
+    for key, expected in fields.items():
+        if key == "metadata.name" and metadata.get("name") != expected:
+            return False
+        if key == "metadata.namespace" and metadata.get("namespace") != expected:
+            return False
+    obj_labels = metadata.get("labels") or {}
+    return all(obj_labels.get(key) == expected for key, expected in labels.items())
+
+
+def _accepts(accept, name):
+    """
+    Return whether the Accept header takes the meta.k8s.io/v1 name form,
+    or the full objects when name is None, before any other form
+    """
+    for media_range in (accept or "application/json").split(","):
+        params = dict(
+            param.strip().partition("=")[::2]
+            for param in media_range.split(";")[1:]
+        )
+        if params.get("as") is None and media_range.split(";")[0].strip() in (
+            "application/json", "*/*"
+        ):
+            return name is None
+        if params.get("as") == name:
+            return True
+    return False
+
+
+def _metadata_only(obj):
+    return {
+        "apiVersion": "meta.k8s.io/v1",
+        "kind": "PartialObjectMetadata",
+        "metadata": obj["metadata"],
+    }
+
+
+class Store:
+    """
+    Objects and the event log, guarded by one condition variable
+    """
+
+    def __init__(self, terminating=0.0):
+        self.terminating = terminating
+        self.kinds = {}
+        for entry in KINDS:
+            kind = _Kind(*entry)
+            self.kinds[(kind.group, kind.version, kind.plural)] = kind
+        self.by_kind = {
+            (kind.api_version, kind.kind): kind for kind in self.kinds.values()
+        }
+        self.objects = {}
+        self.events = []
+        self.revision = 0
+        self.changed = threading.Condition()
+        for element in SEED:
+            self.create(self.kind_of(element), element.get("metadata", {}).get("namespace"),
+                        element)
+
+    def kind_of(self, element):
+        try:
+            return self.by_kind[(element["apiVersion"], element["kind"])]
+        except KeyError:
+            raise ApiError(404, "NotFound", "kind {} {} is not served".format(
+                element.get("apiVersion"), element.get("kind")))
+
+    def _key(self, kind, namespace, name):
+        return (kind.group, kind.plural, namespace if kind.namespaced else None, name)
+
+    def _record(self, event_type, obj):
+        self.events.append((self.revision, event_type, copy.deepcopy(obj)))
+        self.changed.notify_all()
+
+    def _bump(self, obj):
+        self.revision += 1
+        obj["metadata"]["resourceVersion"] = str(self.revision)
+
+    def get(self, kind, namespace, name):
+        with self.changed:
+            obj = self.objects.get(self._key(kind, namespace, name))
+            if obj is None:
+                raise ApiError(404, "NotFound", '{} "{}" not found'.format(
+                    kind.plural, name))
+            return copy.deepcopy(obj)
+
+    def list(self, kind, namespace, fields, labels):
+        with self.changed:
+            items = [
+                copy.deepcopy(obj)
+                for key, obj in sorted(self.objects.items(), key=lambda e: str(e[0]))
+                if key[:2] == (kind.group, kind.plural)
+                and (namespace is None or key[2] == namespace)
+                and _matches(obj, fields, labels)
+            ]
+            return items, self.revision
+
+    def create(self, kind, namespace, body):
+        with self.changed:
+            obj = copy.deepcopy(body)
+            obj["apiVersion"] = kind.api_version
+            obj["kind"] = kind.kind
+            metadata = obj.setdefault("metadata", {})
+            if kind.namespaced:
+                metadata["namespace"] = namespace or metadata.get("namespace") or "default"
+            else:
+                metadata.pop("namespace", None)
+            if not metadata.get("name"):
+                raise ApiError(422, "Invalid", "metadata.name is required")
+            key = self._key(kind, metadata.get("namespace"), metadata["name"])
+            if key in self.objects:
+                raise ApiError(409, "AlreadyExists", '{} "{}" already exists'.format(
+                    kind.plural, metadata["name"]))
+            metadata["uid"] = str(uuid.uuid4())
+            metadata["creationTimestamp"] = _now()
+            metadata["generation"] = 1
+            self._reconcile(kind, obj)
+            self._bump(obj)
+            self.objects[key] = obj
+            self._record("ADDED", obj)
+            self._created(kind, obj)
+            return copy.deepcopy(obj)
+
+    def update(self, kind, namespace, name, patch=None, body=None, upsert=False):
+        with self.changed:
+            key = self._key(kind, namespace, name)
+            current = self.objects.get(key)
+            if current is None:
+                if upsert:
+                    body = copy.deepcopy(patch)
+                    body.setdefault("metadata", {})["name"] = name
+                    return self.create(kind, namespace, body)
+                raise ApiError(404, "NotFound", '{} "{}" not found'.format(
+                    kind.plural, name))
+            if body is not None:
+                obj = copy.deepcopy(body)
+                metadata = obj.setdefault("metadata", {})
+                for field in ("name", "namespace", "uid", "creationTimestamp"):
+                    if field in current["metadata"]:
+                        metadata[field] = current["metadata"][field]
+                obj["apiVersion"] = kind.api_version
+                obj["kind"] = kind.kind
+            else:
+                obj = _merge(copy.deepcopy(current), patch)
+                obj["metadata"]["name"] = name
+            self._reconcile(kind, obj)
+            if obj == current:
+                return copy.deepcopy(current)
+            obj["metadata"]["generation"] = current["metadata"].get("generation", 1) + 1
+            self._bump(obj)
+            self.objects[key] = obj
+            self._record("MODIFIED", obj)
+            return copy.deepcopy(obj)
+
+    def delete(self, kind, namespace, name):
+        with self.changed:
+            key = self._key(kind, namespace, name)
+            obj = self.objects.get(key)
+            if obj is None:
+                raise ApiError(404, "NotFound", '{} "{}" not found'.format(
+                    kind.plural, name))
+            if kind.kind in ("Namespace", "Project") and self.terminating:
+                return self._terminate(name)
+            del self.objects[key]
+            self._bump(obj)
+            self._record("DELETED", obj)
+            if kind.kind in ("Namespace", "Project"):
+                self._delete_namespace(name)
+            elif kind.kind == "VolumeSnapshot":
+                self._delete_content(obj)
+            return copy.deepcopy(obj)
+
+    def _terminate(self, name):
+        """
+        Keep the namespace Terminating for self.terminating seconds
+        """
+        namespace = self.objects.get(("", "namespaces", None, name))
+        if namespace is not None and namespace["status"]["phase"] != "Terminating":
+            namespace["status"]["phase"] = "Terminating"
+            namespace["metadata"]["deletionTimestamp"] = _now()
+            self._bump(namespace)
+            self._record("MODIFIED", namespace)
+            timer = threading.Timer(self.terminating, self._finish_terminate, [name])
+            timer.daemon = True
+            timer.start()
+        return copy.deepcopy(namespace)
+
+    def _finish_terminate(self, name):
+        with self.changed:
+            self._delete_namespace(name)
+
+    def _delete_namespace(self, name):
+        for key in [key for key in self.objects if key[2] == name]:
+            obj = self.objects.pop(key)
+            self._bump(obj)
+            self._record("DELETED", obj)
+        for plural in ("namespaces", "projects"):
+            group = "" if plural == "namespaces" else "project.openshift.io"
+            obj = self.objects.pop((group, plural, None, name), None)
+            if obj is not None:
+                self._bump(obj)
+                self._record("DELETED", obj)
+
+    def _delete_content(self, snapshot):
+        """
+        Delete the bound content of snapshot unless it is retained
+        """
+        name = (snapshot.get("status") or {}).get("boundVolumeSnapshotContentName")
+        key = ("snapshot.storage.k8s.io", "volumesnapshotcontents", None, name)
+        obj = self.objects.get(key)
+        if obj is not None and obj["spec"].get("deletionPolicy") != "Retain":
+            del self.objects[key]
+            self._bump(obj)
+            self._record("DELETED", obj)
+
+    def _reconcile(self, kind, obj):
+        if kind.kind == "Secret" and "stringData" in obj:
+            # Like the API server, store stringData base64 encoded in data
+            data = obj.get("data") or {}
+            for key, value in (obj.pop("stringData") or {}).items():
+                data[key] = base64.b64encode(str(value).encode("utf-8")).decode("ascii")
+            obj["data"] = data
+        spec = obj.get("spec") or {}
+        status = obj.setdefault("status", {})
+        if kind.kind in ("Namespace", "Project"):
+            status["phase"] = "Active"
+        elif kind.kind == "Pod":
+            status["phase"] = "Running"
+            status["conditions"] = [{"type": "Ready", "status": "True"}]
+        elif kind.kind == "PersistentVolumeClaim":
+            status["phase"] = "Bound"
+            requests = (spec.get("resources") or {}).get("requests") or {}
+            status["capacity"] = dict(requests)
+        elif kind.kind == "ObjectBucketClaim":
+            status["phase"] = "Bound"
+        elif kind.kind == "VolumeSnapshot":
+            status["readyToUse"] = True
+        elif kind.kind in ("Deployment", "StatefulSet"):
+            replicas = spec.get("replicas", 1)
+            status["replicas"] = replicas
+            status["readyReplicas"] = replicas
+            status["availableReplicas"] = replicas
+            status["conditions"] = [{"type": "Available", "status": "True"}]
+        elif kind.kind == "Job":
+            status["succeeded"] = 1
+            status["conditions"] = [{"type": "Complete", "status": "True"}]
+        if not status:
+            obj.pop("status")
+
+    def _created(self, kind, obj):
+        """
+        Create the objects a controller would create for obj
+        """
+        name = obj["metadata"]["name"]
+        namespace = obj["metadata"].get("namespace")
+        if kind.kind == "Project":
+            key = ("", "namespaces", None, name)
+            if key not in self.objects:
+                self.create(self.by_kind[("v1", "Namespace")], None,
+                            {"metadata": {"name": name}})
+        elif kind.kind == "VolumeSnapshot":
+            content = "snapcontent-{}".format(obj["metadata"]["uid"])
+            obj["status"]["boundVolumeSnapshotContentName"] = content
+            content_kind = self.by_kind[("snapshot.storage.k8s.io/v1", "VolumeSnapshotContent")]
+            self.create(content_kind, None, {
+                "metadata": {"name": content},
+                "spec": {
+                    "deletionPolicy": "Delete",
+                    "volumeSnapshotRef": {"name": name, "namespace": namespace},
+                },
+            })
+        elif kind.kind == "ObjectBucketClaim":
+            bucket = obj.get("spec", {}).get("bucketName") or "{}-{}".format(
+                name, obj["metadata"]["uid"][:8])
+            owned = {"name": name, "namespace": namespace}
+            for kind_name, extra in (
+                ("ConfigMap", {"data": {
+                    "BUCKET_HOST": "rook-ceph-rgw-ocs-storagecluster-cephobjectstore"
+                                   ".openshift-storage.svc",
+                    "BUCKET_NAME": bucket,
+                    "BUCKET_PORT": "443",
+                    "BUCKET_REGION": "us-east-1",
+                }}),
+                ("Secret", {"data": {
+                    "AWS_ACCESS_KEY_ID": base64.b64encode(b"FAKEACCESSKEY").decode(),
+                    "AWS_SECRET_ACCESS_KEY": base64.b64encode(b"FAKESECRET").decode(),
+                }}),
+            ):
+                key = ("", kind_name.lower() + "s", namespace, name)
+                if key not in self.objects:
+                    body = dict(extra, metadata=dict(owned))
+                    self.create(self.by_kind[("v1", kind_name)], namespace, body)
+
+    def events_after(self, revision, kind, namespace, fields, labels):
+        """
+        Return the events newer than revision for the watched objects, or
+        None when revision is older than the retained history
+        """
+        if self.events and revision < self.events[0][0] - 1:
+            return None
+        result = []
+        for event_revision, event_type, obj in self.events:
+            if event_revision <= revision:
+                continue
+            if (obj["apiVersion"], obj["kind"]) != (kind.api_version, kind.kind):
+                continue
+            if namespace is not None and obj["metadata"].get("namespace") != namespace:
+                continue
+            if _matches(obj, fields, labels):
+                result.append((event_revision, event_type, obj))
+        return result
+
+
+class Stats:
+    """
+    Request counters of the server
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.by_verb = {}
+
+    def record(self, verb, bytes_in, bytes_out):
+        with self.lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.by_verb[verb] = self.by_verb.get(verb, 0) + 1
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "by_verb": dict(self.by_verb),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    # Plumbing
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, code, payload, verb, bytes_in):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if verb is not None:
+            self.server.stats.record(verb, bytes_in, len(data))
+
+    def _send_text(self, code, text, verb, bytes_in):
+        data = text.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.stats.record(verb, bytes_in, len(data))
+
+    def _status(self, error):
+        return {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "metadata": {},
+            "status": "Failure",
+            "message": str(error),
+            "reason": error.reason,
+            "code": error.code,
+        }
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self._read_body()
+
+        if url.path == "/_bench/stats":
+            return self._send(200, self.server.stats.to_dict(), None, 0)
+        if url.path == "/_bench/reset":
+            self.server.stats.reset()
+            return self._send(200, {}, None, 0)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        verb = method.lower()
+        try:
+            if url.path in ("/readyz", "/healthz", "/livez"):
+                return self._send_text(200, "ok", "health", len(body))
+            if url.path in ("/version", "/api", "/apis") or self._is_discovery(url.path):
+                verb = "discovery"
+                return self._send(200, self._discovery(url.path), verb, len(body))
+            kind, namespace, name = self._route(url.path)
+            # Booleans are parsed like Go's strconv.ParseBool
+            if method == "GET" and query.get("watch") in ("1", "t", "T", "true", "True", "TRUE"):
+                return self._watch(kind, namespace, query, len(body))
+            payload, code, verb = self._handle(method, kind, namespace, name, query, body)
+            return self._send(code, payload, verb, len(body))
+        except ApiError as e:
+            return self._send(e.code, self._status(e), verb, len(body))
+
+    # Discovery
+
+    def _is_discovery(self, path):
+        parts = [part for part in path.split("/") if part]
+        return (parts[:1] == ["api"] and len(parts) == 2) or (
+            parts[:1] == ["apis"] and len(parts) in (2, 3))
+
+    def _discovery(self, path):
+        store = self.server.store
+        if path == "/version":
+            return {"major": "1", "minor": "23", "gitVersion": "v1.23.5+fake"}
+        if path == "/api":
+            return {"kind": "APIVersions", "versions": ["v1"]}
+        groups = {}
+        for kind in store.kinds.values():
+            groups.setdefault(kind.group, set()).add(kind.version)
+        if path == "/apis":
+            return {
+                "kind": "APIGroupList",
+                "apiVersion": "v1",
+                "groups": [
+                    {
+                        "name": group,
+                        "versions": [
+                            {"groupVersion": "{}/{}".format(group, version),
+                             "version": version}
+                            for version in sorted(versions)
+                        ],
+                        "preferredVersion": {
+                            "groupVersion": "{}/{}".format(
+                                group, max(versions, key=_version_order)),
+                            "version": max(versions, key=_version_order),
+                        },
+                    }
+                    for group, versions in sorted(groups.items()) if group
+                ],
+            }
+        parts = [part for part in path.split("/") if part]
+        if parts[0] == "api":
+            group, version = "", parts[1]
+        elif len(parts) == 3:
+            group, version = parts[1], parts[2]
+        else:
+            raise ApiError(404, "NotFound", "the server could not find the requested resource")
+        resources = [
+            {
+                "name": kind.plural,
+                "singularName": kind.kind.lower(),
+                "namespaced": kind.namespaced,
+                "kind": kind.kind,
+                "verbs": VERBS,
+            }
+            for kind in store.kinds.values()
+            if kind.group == group and kind.version == version
+        ]
+        if not resources:
+            raise ApiError(404, "NotFound", "the server could not find the requested resource")
+        return {
+            "kind": "APIResourceList",
+            "apiVersion": "v1",
+            "groupVersion": "{}/{}".format(group, version) if group else version,
+            "resources": resources,
+        }
+
+    # Objects
+
+    def _route(self, path):
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] == ["api"] and len(parts) >= 3:
+            group, version, rest = "", parts[1], parts[2:]
+        elif parts[:1] == ["apis"] and len(parts) >= 4:
+            group, version, rest = parts[1], parts[2], parts[3:]
+        else:
+            raise ApiError(404, "NotFound", "the server could not find the requested resource")
+        namespace = None
+        if rest[0] == "namespaces" and len(rest) >= 3:
+            namespace, rest = rest[1], rest[2:]
+        if rest[-1] == "status" and len(rest) == 3:
+            rest = rest[:2]
+        kind = self.server.store.kinds.get((group, version, rest[0]))
+        if kind is None or len(rest) > 2:
+            raise ApiError(404, "NotFound", "the server could not find the requested resource")
+        return kind, namespace, rest[1] if len(rest) == 2 else None
+
+    def _parse(self, body):
+        if not body:
+            return {}
+        try:
+            return json.loads(body)
+        except ValueError:
+            import yaml
+            return yaml.safe_load(body)
+
+    def _handle(self, method, kind, namespace, name, query, body):
+        store = self.server.store
+        accept = self.headers.get("Accept")
+        if method == "GET" and name is None:
+            items, revision = store.list(
+                kind, namespace,
+                _selector(query.get("fieldSelector")),
+                _selector(query.get("labelSelector")),
+            )
+            metadata = {"resourceVersion": str(revision)}
+            # The continue token is the offset of the next item
+            offset = int(query.get("continue") or 0)
+            limit = int(query.get("limit") or 0)
+            items = items[offset:]
+            if limit and len(items) > limit:
+                metadata["continue"] = str(offset + limit)
+                metadata["remainingItemCount"] = len(items) - limit
+                items = items[:limit]
+            payload = {
+                "kind": kind.kind + "List",
+                "apiVersion": kind.api_version,
+                "metadata": metadata,
+                "items": items,
+            }
+            if _accepts(accept, "PartialObjectMetadataList"):
+                payload.update(
+                    kind="PartialObjectMetadataList",
+                    apiVersion="meta.k8s.io/v1",
+                    items=[_metadata_only(obj) for obj in items],
+                )
+            elif not _accepts(accept, None):
+                raise ApiError(406, "NotAcceptable", "only the following media types are accepted: application/json")
+            return payload, 200, "list"
+        if method == "GET":
+            obj = store.get(kind, namespace, name)
+            if _accepts(accept, "PartialObjectMetadata"):
+                return _metadata_only(obj), 200, "get"
+            if not _accepts(accept, None):
+                raise ApiError(406, "NotAcceptable", "only the following media types are accepted: application/json")
+            return obj, 200, "get"
+        if method == "POST":
+            return store.create(kind, namespace, self._parse(body)), 201, "create"
+        if name is None:
+            raise ApiError(405, "MethodNotAllowed", "a name is required")
+        if method == "PUT":
+            return store.update(kind, namespace, name, body=self._parse(body)), 200, "update"
+        if method == "PATCH":
+            content_type = self.headers.get("Content-Type", "")
+            if "json-patch" in content_type:
+                raise ApiError(415, "UnsupportedMediaType", "json patches are not supported")
+            apply = "apply-patch" in content_type
+            # Like OpenShift, applying a project that does not exist is NotFound
+            obj = store.update(kind, namespace, name, patch=self._parse(body),
+                               upsert=apply and kind.kind != "Project")
+            return obj, 200, "apply" if apply else "patch"
+        if method == "DELETE":
+            return store.delete(kind, namespace, name), 200, "delete"
+        raise ApiError(405, "MethodNotAllowed", "method not allowed")
+
+    def _chunk(self, event):
+        data = json.dumps(event).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+        return len(data)
+
+    def _watch(self, kind, namespace, query, bytes_in):
+        store = self.server.store
+        fields = _selector(query.get("fieldSelector"))
+        labels = _selector(query.get("labelSelector"))
+        timeout = int(query.get("timeoutSeconds") or 60)
+        deadline = time.monotonic() + timeout
+        with store.changed:
+            revision = int(query.get("resourceVersion") or store.revision)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sent = 0
+        try:
+            while True:
+                with store.changed:
+                    events = store.events_after(revision, kind, namespace, fields, labels)
+                    if events == []:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        store.changed.wait(remaining)
+                        continue
+                if events is None:
+                    error = ApiError(410, "Expired", "too old resource version")
+                    sent += self._chunk({"type": "ERROR", "object": self._status(error)})
+                    break
+                for event_revision, event_type, obj in events:
+                    sent += self._chunk({"type": event_type, "object": obj})
+                    revision = event_revision
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.server.stats.record("watch", bytes_in, sent)
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding a Store and its request Stats
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, terminating=0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.store = Store(terminating)
+        self.stats = Stats()
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
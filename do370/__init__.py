@@ -6,3 +6,13 @@ try:
         os.path.dirname(module.__file__) + "/ansible/roles"
 except ModuleNotFoundError:
     pass
+
+# Report import times at exit, see do370.common.lazy
+if os.environ.get("DO370_PROFILE_IMPORTS"):
+    from do370.common import lazy
+    lazy.profile_imports()
+
+# Record a Chrome trace of the run, see do370.common.trace
+if os.environ.get("DO370_TRACE"):
+    from do370.common import trace
+    trace.enable(os.environ["DO370_TRACE"])
@@ -0,0 +1,319 @@
+#!/usr/bin/python
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+
+DOCUMENTATION = r"""
+---
+module: do370_k8s_wait
+short_description: Wait for Kubernetes objects to satisfy a condition
+description:
+  - Lists the selected objects once, then follows a watch stream from the
+    returned resourceVersion and returns as soon as the condition holds,
+    instead of polling with retries and delay.
+  - When the watch stream ends it is resumed from the last resourceVersion
+    seen. When the server expired that version, the objects are listed again.
+    Any other error event fails the task.
+  - With I(state=present), the wait is over once at least one object is
+    selected and every selected object has the wanted I(phase) and
+    I(wait_condition). With I(state=absent), once no object is selected.
+options:
+  api_version:
+    description: API version of the objects.
+    type: str
+    default: v1
+  kind:
+    description: Kind of the objects.
+    type: str
+    required: true
+  name:
+    description: Name of the object to wait for.
+    type: str
+  namespace:
+    description: Namespace of the objects, omitted for cluster-scoped kinds.
+    type: str
+  label_selectors:
+    description: Label selectors, as in kubernetes.core.k8s_info.
+    type: list
+    elements: str
+    default: []
+  field_selectors:
+    description: Field selectors, as in kubernetes.core.k8s_info.
+    type: list
+    elements: str
+    default: []
+  state:
+    description: Whether to wait for the objects to exist or to be gone.
+    type: str
+    choices: [present, absent]
+    default: present
+  phase:
+    description: Wanted C(status.phase) of the objects.
+    type: str
+  wait_condition:
+    description: Wanted entry of C(status.conditions) of the objects.
+    type: dict
+    suboptions:
+      type:
+        description: Type of the condition.
+        type: str
+        required: true
+      status:
+        description: Status of the condition.
+        type: str
+        choices: ["True", "False", "Unknown"]
+        default: "True"
+  timeout:
+    description: Seconds to wait before failing.
+    type: int
+    default: 300
+  host:
+    description: API server URL, overrides the kubeconfig.
+    type: str
+  kubeconfig:
+    description: Path to the kubeconfig file.
+    type: path
+  validate_certs:
+    description: Verify the API server certificate.
+    type: bool
+requirements:
+  - kubernetes >= 12.0.1
+"""
+
+EXAMPLES = r"""
+- name: Wait for the kube-apiserver cluster operator to finish progressing
+  do370_k8s_wait:
+    api_version: config.openshift.io/v1
+    kind: ClusterOperator
+    name: kube-apiserver
+    wait_condition:
+      type: Progressing
+      status: "False"
+    timeout: 900
+
+- name: Wait for the namespace to be deleted
+  do370_k8s_wait:
+    kind: Namespace
+    name: example
+    state: absent
+"""
+
+RETURN = r"""
+resources:
+  description: The selected objects when the wait ended, sorted by name.
+  returned: always
+  type: list
+elapsed:
+  description: Seconds spent waiting.
+  returned: always
+  type: float
+"""
+
+import math
+import time
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
+
+try:
+    from kubernetes import client, config
+    from kubernetes.client.rest import ApiException
+    from kubernetes.dynamic import DynamicClient
+    HAS_KUBERNETES = True
+except ImportError:
+    HAS_KUBERNETES = False
+    KUBERNETES_IMPORT_ERROR = traceback.format_exc()
+
+# Status of a watch whose resourceVersion the server no longer keeps
+GONE = 410
+
+
+class WatchError(Exception):
+    """
+    ERROR event of a watch stream, other than an expired resourceVersion
+    """
+
+
+def _client(params):
+    configuration = client.Configuration()
+    try:
+        config.load_kube_config(
+            config_file=params["kubeconfig"], client_configuration=configuration
+        )
+    except Exception:
+        if not params["host"]:
+            raise
+    if params["host"]:
+        configuration.host = params["host"]
+    if params["validate_certs"] is not None:
+        configuration.verify_ssl = params["validate_certs"]
+    return DynamicClient(client.ApiClient(configuration))
+
+
+def _resources(objects):
+    return [objects[name] for name in sorted(objects)]
+
+
+def _satisfies(obj, phase, wait_condition):
+    status = obj.get("status") or {}
+    if phase is not None and status.get("phase") != phase:
+        return False
+    if wait_condition is not None:
+        return any(
+            condition.get("type") == wait_condition["type"]
+            and condition.get("status") == wait_condition["status"]
+            for condition in status.get("conditions") or []
+        )
+    return True
+
+
+def _wanted(params):
+    if params["state"] == "absent":
+        return "to be gone"
+    wanted = []
+    if params["phase"] is not None:
+        wanted.append("phase {}".format(params["phase"]))
+    if params["wait_condition"] is not None:
+        wanted.append("condition {type}={status}".format(**params["wait_condition"]))
+    return "to have " + " and ".join(wanted) if wanted else "to exist"
+
+
+class Waiter:
+    """
+    Objects selected by the module parameters, kept up to date from a watch
+    """
+
+    def __init__(self, dynamic_client, params):
+        self.client = dynamic_client
+        self.resource = dynamic_client.resources.get(
+            api_version=params["api_version"], kind=params["kind"]
+        )
+        self.namespace = params["namespace"]
+        field_selectors = list(params["field_selectors"])
+        if params["name"]:
+            field_selectors.append("metadata.name={}".format(params["name"]))
+        self.field_selector = ",".join(field_selectors) or None
+        self.label_selector = ",".join(params["label_selectors"]) or None
+        self.state = params["state"]
+        self.phase = params["phase"]
+        self.wait_condition = params["wait_condition"]
+        self.objects = {}
+
+    def holds(self):
+        if self.state == "absent":
+            return not self.objects
+        return bool(self.objects) and all(
+            _satisfies(obj, self.phase, self.wait_condition)
+            for obj in self.objects.values()
+        )
+
+    def _list(self):
+        listing = self.resource.get(
+            namespace=self.namespace,
+            label_selector=self.label_selector,
+            field_selector=self.field_selector,
+        ).to_dict()
+        self.objects = {
+            obj["metadata"]["name"]: obj for obj in listing["items"]
+        }
+        return listing["metadata"]["resourceVersion"]
+
+    def wait(self, deadline):
+        """
+        Return True once the condition holds, False at the deadline
+        """
+        resource_version = self._list()
+        while not self.holds():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                for event in self.client.watch(
+                    self.resource,
+                    namespace=self.namespace,
+                    label_selector=self.label_selector,
+                    field_selector=self.field_selector,
+                    resource_version=resource_version,
+                    timeout=math.ceil(remaining),
+                ):
+                    obj = event["raw_object"]
+                    if event["type"] == "ERROR":
+                        if obj.get("code") != GONE:
+                            raise WatchError(obj.get("message") or obj)
+                        resource_version = self._list()
+                        break
+                    resource_version = obj["metadata"]["resourceVersion"]
+                    if event["type"] == "DELETED":
+                        self.objects.pop(obj["metadata"]["name"], None)
+                    elif event["type"] in ("ADDED", "MODIFIED"):
+                        self.objects[obj["metadata"]["name"]] = obj
+                    else:
+                        # BOOKMARK events only move the resourceVersion
+                        continue
+                    if self.holds():
+                        return True
+            except ApiException as e:
+                if e.status != GONE:
+                    raise
+                resource_version = self._list()
+        return True
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            api_version=dict(type="str", default="v1"),
+            kind=dict(type="str", required=True),
+            name=dict(type="str"),
+            namespace=dict(type="str"),
+            label_selectors=dict(type="list", elements="str", default=[]),
+            field_selectors=dict(type="list", elements="str", default=[]),
+            state=dict(type="str", choices=["present", "absent"], default="present"),
+            phase=dict(type="str"),
+            wait_condition=dict(
+                type="dict",
+                options=dict(
+                    type=dict(type="str", required=True),
+                    status=dict(type="str", choices=["True", "False", "Unknown"],
+                                default="True"),
+                ),
+            ),
+            timeout=dict(type="int", default=300),
+            host=dict(type="str"),
+            kubeconfig=dict(type="path"),
+            validate_certs=dict(type="bool"),
+        ),
+        supports_check_mode=True,
+    )
+    if not HAS_KUBERNETES:
+        module.fail_json(msg=missing_required_lib("kubernetes"),
+                         exception=KUBERNETES_IMPORT_ERROR)
+
+    start = time.monotonic()
+    try:
+        waiter = Waiter(_client(module.params), module.params)
+        done = waiter.wait(start + module.params["timeout"])
+    except Exception as e:
+        module.fail_json(msg="{}: {}".format(e.__class__.__name__, e),
+                         exception=traceback.format_exc())
+
+    result = dict(
+        changed=False,
+        resources=_resources(waiter.objects),
+        elapsed=round(time.monotonic() - start, 2),
+    )
+    if not done:
+        module.fail_json(
+            msg="Timed out after {}s waiting for {} {}".format(
+                module.params["timeout"], module.params["kind"],
+                _wanted(module.params)),
+            **result
+        )
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
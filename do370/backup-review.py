@@ -19,16 +19,15 @@ backup-review guided exercise.
 
 import os
 import sys
-import pkg_resources
 import logging
 import json
-import yaml
 
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, executor, manifests, materials, odf, projects, session, snapshot, teardown, volumesnapshots
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -62,6 +61,7 @@ class BackupReview(OpenShift):
         logging.debug("init class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -77,69 +77,78 @@ class BackupReview(OpenShift):
         items = [
             {
                 "label": "Checking lab systems",
+                "key": "systems",
                 "task": labtools.check_host_reachable,
                 "hosts": _targets,
                 "fatal": True,
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
             },
             {
                 "label": "Remove volumes",
+                "converge": False,
                 "task": self._finish_remove_volumes,
                 "fatal": False,
             },
             {
                 "label": "Remove resources",
+                "converge": False,
                 "task": self._finish_remove_resources,
                 "resources_file": "resources.yaml",
                 "fatal": True,
             },
             {
                 "label": "Project '{}' is not present".format(NAMESPACE),
-                "task": self._fail_if_exists,
-                "name": NAMESPACE,
-                "type": "Project",
-                "api": "project.openshift.io/v1",
-                "namespace": None,
+                "converge": False,
+                "key": "project_absent",
+                "task": self._start_wait_project_absent,
                 "fatal": True
             },
             {
                 "label": "Copy exercise files",
+                "depends_on": ["systems"],
                 "task": labtools.copy_lab_files,
                 "lab_name": self.__LAB__,
                 "fatal": True,
             },
             {
                 "label": "Create project",
+                "key": "project",
+                "depends_on": ["project_absent"],
                 "task": self._start_create_project,
                 "fatal": True,
             },
             {
                 "label": "Create resources",
+                "depends_on": ["project"],
                 "task": self._start_create_resources,
                 "resources_file": "resources.yaml",
                 "fatal": True,
             },
         ]
+        if manifests.converging():
+            # Keep what is already in place, see manifests.converge()
+            items = manifests.converge_items(items)
+
         logging.debug("start()=>run")
-        userinterface.Console(items).run_items(action="Starting")
+        executor.Console(items).run_items(action="Starting")
 
     def grade(self):
         """
@@ -172,6 +181,7 @@ class BackupReview(OpenShift):
         items = [
             {
                 "label": "Checking lab systems",
+                "key": "systems",
                 "task": labtools.check_host_reachable,
                 "hosts": _targets,
                 "fatal": True,
@@ -194,13 +204,14 @@ class BackupReview(OpenShift):
             },
             {
                 "label": "Remove lab files",
+                "depends_on": ["systems"],
                 "task": labtools.delete_workdir,
                 "lab_name": self.__LAB__,
                 "fatal": True
             },
         ]
         logging.debug("finish()=>run")
-        userinterface.Console(items).run_items(action="Finishing")
+        executor.Console(items).run_items(action="Finishing")
 
     ############################################################################
     # Start tasks
@@ -245,46 +256,20 @@ class BackupReview(OpenShift):
     def _start_create_resources(self, item):
         logging.debug("_start_create_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Create resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Apply resources from composite yaml file
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Creating resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Create {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    # Attempt to create the object and handle exceptions
-                    try:
-                        resp = resource.create(body=element, namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "ConflictError"):
-                            logging.info("Element already exists")
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            # Only missing or drifted objects are sent when converging
+            create = manifests.converge if manifests.converging() else manifests.apply
+            results = create(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = manifests.report(results)
+            item["failed"] = manifests.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not create resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -295,6 +280,28 @@ class BackupReview(OpenShift):
             }
         return item["failed"]
 
+    def _start_wait_project_absent(self, item):
+        logging.debug("_start_wait_project_absent()")
+        item["msgs"] = []
+        try:
+            # A project deleted by a recent finish may still be terminating
+            result = projects.wait_gone(self.oc_client, NAMESPACE)
+            item["failed"] = result["status"] != "absent"
+            if result["status"] == "present":
+                item["msgs"] = [{"text":
+                    "The {} project already exists, ".format(NAMESPACE) +
+                    "please run 'lab finish {}'".format(self.__LAB__)}]
+            else:
+                item["msgs"] = projects.report(NAMESPACE, result)
+        except Exception as e:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not get the {} project".format(NAMESPACE)}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
+        return item["failed"]
+
     ############################################################################
     # Grading tasks
 
@@ -302,6 +309,15 @@ class BackupReview(OpenShift):
         logging.debug("_grade_test()")
         item["msgs"] = []
         try:
+            # List every kind needed by the checks once
+            objects = snapshot.Snapshot(self.oc_client, NAMESPACE, [
+                ("v1", "PersistentVolumeClaim"),
+                ("snapshot.storage.k8s.io/v1", "VolumeSnapshot"),
+                ("snapshot.storage.k8s.io/v1", "VolumeSnapshotContent"),
+                ("apps/v1", "Deployment"),
+                ("batch/v1", "Job"),
+            ])
+
             # Check if the PersistentVolumeClaims exist
             pvcs = {
                 "postgresql-data": None,
@@ -311,29 +327,16 @@ class BackupReview(OpenShift):
                 }
 
             for pvc in pvcs:
-                logging.info("Get {}/{}".format("PersistentVolumeClaim", pvc))
-                pvcs[pvc] = self.oc_client.resources.get(
-                    api_version="v1",
-                    kind="PersistentVolumeClaim",
-                ).get(name=pvc, namespace=NAMESPACE)
-                pvcs[pvc] = pvcs[pvc].to_dict()
+                pvcs[pvc] = objects.get("PersistentVolumeClaim", pvc)
 
             # Check if the VolumeSnapshot exists
-            logging.info("Get {}/{}".format("VolumeSnapshot", "postgresql-data-snapshot"))
-            volume_snapshot = self.oc_client.resources.get(
-                api_version="snapshot.storage.k8s.io/v1",
-                kind="VolumeSnapshot",
-            ).get(name="postgresql-data-snapshot", namespace=NAMESPACE)
-            volume_snapshot = volume_snapshot.to_dict()
+            volume_snapshot = objects.get("VolumeSnapshot", "postgresql-data-snapshot")
 
             # Check if the VolumeSnapshotContent exists
             volume_snapshot_content_name = volume_snapshot["status"]["boundVolumeSnapshotContentName"]
-            logging.info("Get {}/{}".format("VolumeSnapshotContent", volume_snapshot_content_name))
-            volume_snapshot_content = self.oc_client.resources.get(
-                api_version="snapshot.storage.k8s.io/v1",
-                kind="VolumeSnapshotContent",
-            ).get(name=volume_snapshot_content_name, namespace=None)
-            volume_snapshot_content = volume_snapshot_content.to_dict()
+            volume_snapshot_content = objects.get(
+                "VolumeSnapshotContent", volume_snapshot_content_name
+            )
 
             # Check if the Deployment exists (and points to the PVCs)
             deployments = {
@@ -343,21 +346,11 @@ class BackupReview(OpenShift):
             }
 
             for deployment in deployments:
-                logging.info("Get {}/{}".format("Deployment", deployment))
-                deployments[deployment] = self.oc_client.resources.get(
-                    api_version="apps/v1",
-                    kind="Deployment",
-                ).get(name=deployment, namespace=NAMESPACE)
-                deployments[deployment] = deployments[deployment].to_dict()
+                deployments[deployment] = objects.get("Deployment", deployment)
 
             # Check if the backup job exists
             # Not checking the jobs that alter or insert the database
-            logging.info("Get {}/{}".format("Job", "postgresql-backup"))
-            job = self.oc_client.resources.get(
-                api_version="batch/v1",
-                kind="Job",
-            ).get(name="postgresql-backup", namespace=NAMESPACE)
-            job = job.to_dict()
+            job = objects.get("Job", "postgresql-backup")
 
             # Parse resources
 
@@ -451,92 +444,41 @@ class BackupReview(OpenShift):
 
     def _finish_remove_volumes(self, item):
         logging.debug("_finish_remove_volumes()")
-        lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-
-            # Check if the VolumeSnapshot exists
-            # The VolumeSnapshot will be deleted when the namespace is deleted
-            logging.info("Get {}/{}".format("VolumeSnapshot", "postgresql-data-snapshot"))
-            volume_snapshot = self.oc_client.resources.get(
-                api_version="snapshot.storage.k8s.io/v1",
-                kind="VolumeSnapshot",
-            ).get(name="postgresql-data-snapshot", namespace=NAMESPACE)
-            volume_snapshot = volume_snapshot.to_dict()
-
-            # Delete VolumeSnapshotContent
-            volume_snapshot_content_name = volume_snapshot["status"]["boundVolumeSnapshotContentName"]
-            logging.info("Delete {}/{}".format("VolumeSnapshotContent", volume_snapshot_content_name))
-            volume_snapshot_content = self.oc_client.resources.get(
-                api_version="snapshot.storage.k8s.io/v1",
-                kind="VolumeSnapshotContent",
-            ).delete(name=volume_snapshot_content_name, namespace=None)
-            volume_snapshot_content = volume_snapshot_content.to_dict()
-
-            item["failed"] = False
+            # Delete every VolumeSnapshot of the project and the contents
+            # bound to them, so that no Ceph RBD snapshot is left behind
+            results = volumesnapshots.delete(self.oc_client, [NAMESPACE])
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not delete volume snapshots"})
 
         except Exception as e:
-            exception_name = e.__class__.__name__
-            if (exception_name == "NotFoundError"):
-                logging.info("Resource was not found")
-                item["failed"] = False
-            else:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Could not delete resources"}]
-                item["exception"] = {
-                    "name": exception_name,
-                    "message": str(e),
-                }
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not delete volume snapshots"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
         return item["failed"]
 
     def _finish_remove_resources(self, item):
         logging.debug("_finish_remove_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Delete resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Delete resources from composite yaml file and wait until
+            # they are gone
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Deleting resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Delete {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    try:
-                        resp = resource.delete(name=element["metadata"]["name"], namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "NotFoundError"):
-                            logging.info("Resource was not found")
-                            item["failed"] = False
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            results = teardown.delete(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not delete resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -551,36 +493,20 @@ class BackupReview(OpenShift):
     def _finish_remove_project(self, item):
         logging.debug("_finish_remove_project()")
         item["msgs"] = []
-
-        for target in [NAMESPACE]:
-            try:
-                # Delete Project
-                project = {
-                    "apiVersion": "project.openshift.io/v1",
-                    "kind": "Project",
-                    "metadata": {
-                        "name": target,
-                    },
-                }
-                resource = self.oc_client.resources.get(
-                    api_version=project["apiVersion"], kind=project["kind"]
-                )
-                logging.info("Delete {}/{}".format("project", target))
-                resp = resource.delete(name=target)
-                item["failed"] = False
-
-            except Exception as e:
-                exception_name = e.__class__.__name__
-                if (exception_name == "NotFoundError"):
-                    logging.info("Resource was not found")
-                    item["failed"] = False
-                else:
-                    item["failed"] = True
-                    item["msgs"] = [{"text": "Could not delete resources"}]
-                    logging.debug("Could not delete resources")
-                    item["exception"] = {
-                        "name": exception_name,
-                        "message": str(e),
-                    }
-            item["msgs"].append({"text": "Project"})
+        try:
+            # Delete the project and wait until its namespace is gone, so
+            # that the next start does not find it terminating
+            result = projects.delete(
+                self.oc_client, NAMESPACE, wait=item.get("wait", True)
+            )
+            item["msgs"] = projects.report(NAMESPACE, result)
+            item["failed"] = False
+        except Exception as e:
+            item["failed"] = True
+            logging.debug("Could not delete resources")
+            item["msgs"] = [{"text": "Could not delete resources"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
         return item["failed"]
@@ -24,6 +24,7 @@ from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, odf, session, teardown, volumesnapshots
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -56,6 +57,7 @@ class BackupVolume(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -76,19 +78,19 @@ class BackupVolume(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -129,6 +131,10 @@ class BackupVolume(OpenShift):
                 "task": self._start_remove_label_policy,
                 "fatal": True
             },
+            {
+                "label": "Remove volume snapshots",
+                "task": self._finish_remove_snapshots
+            },
             {
                 "label": "Remove resources",
                 "task": self._finish_remove_resources
@@ -196,6 +202,21 @@ class BackupVolume(OpenShift):
     ############################################################################
     # Finish tasks
 
+    def _finish_remove_snapshots(self, item):
+        item["msgs"] = []
+        try:
+            results = volumesnapshots.delete(self.oc_client, [NAMESPACE])
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+        except Exception as e:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not delete volume snapshots"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
+        return item["failed"]
+
     def _finish_remove_resources(self, item):
         for target in [NAMESPACE]:
             try:
@@ -24,6 +24,7 @@ from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, odf, session
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -56,6 +57,7 @@ class BucketMonitor(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -76,19 +78,19 @@ class BucketMonitor(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
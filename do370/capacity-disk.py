@@ -26,6 +26,7 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
+from do370.common import existence, odf, preflight, readiness, session
 
 import logging
 
@@ -50,6 +51,7 @@ class CapacityExtend(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -59,7 +61,7 @@ class CapacityExtend(OpenShift):
         Prepare the system for starting the lab
         """
 
-        items = [
+        items = preflight.stage([
             {
                 "label": "Checking lab systems",
                 "task": labtools.check_host_reachable,
@@ -84,9 +86,10 @@ class CapacityExtend(OpenShift):
                 "task": self._start_check_cluster_ready,
                 "fatal": True,
             },
+        ]) + [
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -181,26 +184,7 @@ class CapacityExtend(OpenShift):
         return item["failed"]
 
     def _start_check_cluster_ready(self, item):
-        item["failed"] = True
-       # Get resources from cluster to check API
-        self.oc_client.resources.get(
-            api_version="project.openshift.io/v1", kind="Project"
-        ).get()
-        self.oc_client.resources.get(api_version="v1", kind="Node").get()
-        self.oc_client.resources.get(api_version="v1", kind="Namespace").get()
-
-        try:
-            v1_config = self.oc_client.resources.get(
-                api_version="config.openshift.io/v1", kind="ClusterVersion"
-            )
-            cluster_version = v1_config.get().items[0]
-            if cluster_version.spec.clusterID is None:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Cluster ID could not be found"}]
-            else:
-                item["failed"] = False
-        except Exception:
-            item["msgs"] = [{"text": "Cluster is not OpenShift"}]
+        return readiness.check(self.oc_client, item)
 
 
     def _check_ge_namespace(self, item):
@@ -208,7 +192,7 @@ class CapacityExtend(OpenShift):
         Check GE namespace
         """
         item["failed"] = False
-        if self.resource_exists("v1", "Namespace", "capacity-disk-ge", ""):
+        if existence.exists(self.oc_client, "v1", "Namespace", "capacity-disk-ge", ""):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The capacity-disk-ge namespace already exists, please " +
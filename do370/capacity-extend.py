@@ -27,6 +27,7 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
+from do370.common import existence, odf, preflight, readiness, session
 
 import logging
 
@@ -51,6 +52,7 @@ class CapacityExtend(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -60,7 +62,7 @@ class CapacityExtend(OpenShift):
         Prepare the system for starting the lab
         """
 
-        items = [
+        items = preflight.stage([
             {
                 "label": "Checking lab systems",
                 "task": labtools.check_host_reachable,
@@ -85,9 +87,10 @@ class CapacityExtend(OpenShift):
                 "task": self._start_check_cluster_ready,
                 "fatal": True,
             },
+        ]) + [
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -208,26 +211,7 @@ class CapacityExtend(OpenShift):
         return item["failed"]
 
     def _start_check_cluster_ready(self, item):
-        item["failed"] = True
-       # Get resources from cluster to check API
-        self.oc_client.resources.get(
-            api_version="project.openshift.io/v1", kind="Project"
-        ).get()
-        self.oc_client.resources.get(api_version="v1", kind="Node").get()
-        self.oc_client.resources.get(api_version="v1", kind="Namespace").get()
-
-        try:
-            v1_config = self.oc_client.resources.get(
-                api_version="config.openshift.io/v1", kind="ClusterVersion"
-            )
-            cluster_version = v1_config.get().items[0]
-            if cluster_version.spec.clusterID is None:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Cluster ID could not be found"}]
-            else:
-                item["failed"] = False
-        except Exception:
-            item["msgs"] = [{"text": "Cluster is not OpenShift"}]
+        return readiness.check(self.oc_client, item)
 
 
     def _check_ge_namespace(self, item):
@@ -235,7 +219,7 @@ class CapacityExtend(OpenShift):
         Check GE namespace
         """
         item["failed"] = False
-        if self.resource_exists("v1", "Namespace", "capacity-extend-ge", ""):
+        if existence.exists(self.oc_client, "v1", "Namespace", "capacity-extend-ge", ""):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The capacity-extend-ge namespace already exists, please " +
@@ -249,7 +233,7 @@ class CapacityExtend(OpenShift):
         Check GE template
         """
         item["failed"] = False
-        if self.resource_exists("template.openshift.io/v1", "Template", "postgresql-persistent-sc", "openshift"):
+        if existence.exists(self.oc_client, "template.openshift.io/v1", "Template", "postgresql-persistent-sc", "openshift"):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The postgresql-persistent-sc template already exists, please " +
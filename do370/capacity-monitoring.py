@@ -33,7 +33,6 @@ capaticy-monitoring guided exercise (or lab).
 
 import os
 import sys
-import pkg_resources
 
 from datetime import datetime
 from ocp import api
@@ -44,6 +43,7 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
+from do370.common import odf, preflight, readiness, session, waits
 
 import logging
 
@@ -70,6 +70,7 @@ class CapaticyMonitoring(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -78,7 +79,7 @@ class CapaticyMonitoring(OpenShift):
         """
         Prepare the system for starting the lab
         """
-        items = [
+        items = preflight.stage([
             {
                 "label": "Checking lab systems",
                 "task": labtools.check_host_reachable,
@@ -103,9 +104,10 @@ class CapaticyMonitoring(OpenShift):
                 "task": self._start_check_cluster_ready,
                 "fatal": True,
             },
+        ]) + [
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -222,26 +224,7 @@ class CapaticyMonitoring(OpenShift):
         return item["failed"]
 
     def _start_check_cluster_ready(self, item):
-        item["failed"] = True
-       # Get resources from cluster to check API
-        self.oc_client.resources.get(
-            api_version="project.openshift.io/v1", kind="Project"
-        ).get()
-        self.oc_client.resources.get(api_version="v1", kind="Node").get()
-        self.oc_client.resources.get(api_version="v1", kind="Namespace").get()
-
-        try:
-            v1_config = self.oc_client.resources.get(
-                api_version="config.openshift.io/v1", kind="ClusterVersion"
-            )
-            cluster_version = v1_config.get().items[0]
-            if cluster_version.spec.clusterID is None:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Cluster ID could not be found"}]
-            else:
-                item["failed"] = False
-        except Exception:
-            item["msgs"] = [{"text": "Cluster is not OpenShift"}]
+        return readiness.check(self.oc_client, item)
 
 
     def _create_ge_namespace(self, items):
@@ -348,6 +331,24 @@ class CapaticyMonitoring(OpenShift):
         except Exception as e:
             print("Error creating namespace: %s" % e)
 
-        self.wait_for_resource(body['apiVersion'], body['kind'], name, "monitoring-ge")
+        try:
+            pod = waits.wait_for(
+                self.oc_client, body["apiVersion"], body["kind"], name,
+                "monitoring-ge", waits.phase("Running"),
+            )
+        except Exception as e:
+            items["failed"] = True
+            items["msgs"] = [{"text": "Could not wait for pod {}".format(name)}]
+            items["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
+            return items["failed"]
+        if pod is None:
+            items["failed"] = True
+            items["msgs"] = [{"text": "Pod {} is not running".format(name)}]
+        else:
+            items["failed"] = False
+        return items["failed"]
 
 
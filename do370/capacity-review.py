@@ -26,10 +26,9 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
-import pkg_resources
+from do370.common import cache, existence, materials, odf, session
 
 import logging
-import json
 
 _targets = ["localhost"]
 
@@ -47,15 +46,12 @@ class CapacityReview(OpenShift):
         "port": os.environ.get("OCP_PORT", "6443"),
     }
 
-    materials_dir = os.path.join(
-        pkg_resources.resource_filename(__name__, "materials"),
-        "labs",
-        __LAB__,
-    )
+    materials_dir = os.path.join(materials.MATERIALS_DIR, "labs", __LAB__)
 
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -74,19 +70,19 @@ class CapacityReview(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -243,7 +239,7 @@ class CapacityReview(OpenShift):
         Check for deployment: capacity-review-pg
         """
         item["failed"] = True
-        if self.resource_exists("v1", "DeploymentConfig", "capacity-review-pg", "capacity-review"):
+        if existence.exists(self.oc_client, "v1", "DeploymentConfig", "capacity-review-pg", "capacity-review"):
             item["failed"] = False
         else:
             item["msgs"] = [{"text":
@@ -272,7 +268,7 @@ class CapacityReview(OpenShift):
         Check for lab namespace: capacity-review
         """
         item["failed"] = False
-        if self.resource_exists("template.openshift.io/v1", "Template", "postgresql-persistent-sc", "openshift"):
+        if existence.exists(self.oc_client, "template.openshift.io/v1", "Template", "postgresql-persistent-sc", "openshift"):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The postgresql-persistent-sc template already exists, please " +
@@ -285,9 +281,7 @@ class CapacityReview(OpenShift):
         Create a resource from a json file
         TODO: move this one to rht-labs-core api.py
         """
-        f = open(template_file)
-        t = json.load(f)
-        f.close()
+        t = materials.load(template_file)[0]
         res = self.oc_client.resources.get(
             api_version=api_ver, kind=kind
         )
@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Local result cache shared by the DO370 lab scripts.
+
+Students usually run several labs back to back against the same cluster, and
+every lab starts by running the same prerequisite playbooks. Successful
+results are stored under ~/.cache/do370 (or $XDG_CACHE_HOME/do370), keyed by
+the ClusterVersion cluster ID, and are reused until they expire.
+
+Environment variables:
+
+    DO370_PREREQ_TTL   seconds a successful prerequisite stays valid (600)
+    DO370_NO_CACHE     disable the cache when set to a non-empty value
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+
+from do370.common import settings
+
+# Default validity of a successful prerequisite playbook, in seconds
+PREREQ_TTL = 600
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "do370",
+)
+
+_cluster_ids = {}
+_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    JSON file backed key/value store whose entries expire after ttl seconds
+    """
+
+    def __init__(self, name, ttl):
+        self.path = os.path.join(CACHE_DIR, "{}.json".format(name))
+        self.ttl = ttl
+
+    def _load(self):
+        try:
+            with open(self.path) as input_file:
+                return json.load(input_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "w") as output_file:
+            json.dump(entries, output_file)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if missing or expired
+        """
+        if os.environ.get("DO370_NO_CACHE"):
+            return None
+        with _lock:
+            entry = self._load().get(key)
+        if entry is None or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def put(self, key, value):
+        with _lock:
+            entries = self._load()
+            now = time.time()
+            entries = {
+                k: v for k, v in entries.items() if now - v["time"] <= self.ttl
+            }
+            entries[key] = {"time": now, "value": value}
+            try:
+                self._save(entries)
+            except OSError as e:
+                logging.debug("Could not write cache {}: {}".format(self.path, e))
+
+    def invalidate(self, key):
+        with _lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                try:
+                    self._save(entries)
+                except OSError as e:
+                    logging.debug(
+                        "Could not write cache {}: {}".format(self.path, e)
+                    )
+
+
+def cluster_id(oc_client):
+    """
+    Return the ClusterVersion cluster ID, or None if it cannot be read
+    """
+    key = id(oc_client)
+    if key not in _cluster_ids:
+        try:
+            cluster_version = oc_client.resources.get(
+                api_version="config.openshift.io/v1", kind="ClusterVersion"
+            ).get(name="version")
+            _cluster_ids[key] = cluster_version.spec.clusterID
+        except Exception as e:
+            logging.debug("Could not read the cluster ID: {}".format(e))
+            return None
+    return _cluster_ids[key]
+
+
+def playbook_task(lab):
+    """
+    Return an item task that runs item["playbook"] through lab.run_playbook
+    unless it already succeeded on this cluster within DO370_PREREQ_TTL
+    """
+    ttl = settings.integer("DO370_PREREQ_TTL", PREREQ_TTL)
+    results = TTLCache("prereqs", ttl)
+
+    def task(item):
+        cid = cluster_id(lab.oc_client)
+        key = None
+        if cid is not None:
+            key = "{}:{}:{}".format(
+                cid, item["playbook"],
+                json.dumps(item.get("vars", {}), sort_keys=True),
+            )
+            if results.get(key):
+                logging.info("{} succeeded recently".format(item["playbook"]))
+                item["failed"] = False
+                item["msgs"] = [{"text": "Already satisfied"}]
+                return item["failed"]
+
+        failed = lab.run_playbook(item)
+        if failed is None:
+            failed = item.get("failed", True)
+        if key is not None:
+            if failed:
+                results.invalidate(key)
+            else:
+                results.put(key, True)
+        return failed
+    return task
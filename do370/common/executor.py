@@ -0,0 +1,187 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Dependency-aware item runner for DO370 lab scripts.
+
+Lab scripts describe their start, grade and finish steps as a list of item
+dictionaries that ``userinterface.Console`` runs one after the other. This
+module provides a drop-in ``Console`` that runs the items on a bounded pool of
+worker threads instead, honoring two optional item keys:
+
+    "key":        name other items use to refer to this item
+    "depends_on": list of keys that must complete before this item starts
+
+Items without "depends_on" keep the sequential behavior: they wait for every
+item listed before them. Results are still reported in list order, and a
+failed "fatal" item stops every item that has not started yet; items that
+are already running finish normally. Consecutive run_playbook items share
+one ansible process, see do370.common.playbooks.
+"""
+
+import logging
+import threading
+
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from labs.common import userinterface
+from do370.common import playbooks, session
+
+# Default size of the worker pool, see session.workers()
+MAX_WORKERS = 4
+
+
+class _Node:
+    """
+    Scheduling state of a single lab item
+    """
+
+    def __init__(self, index, item):
+        self.index = index
+        self.item = item
+        self.task = item["task"]
+        self.deps = set()
+        self.dependents = []
+        self.pending = 0
+        self.submitted = False
+        self.future = Future()
+
+
+def _build_graph(items):
+    """
+    Return the list of nodes for items, resolving "depends_on" keys.
+
+    Dependencies must refer to items listed earlier, which keeps the graph
+    acyclic and lets the console report results in list order.
+    """
+    nodes = []
+    keys = {}
+    for index, item in enumerate(items):
+        node = _Node(index, item)
+        if "depends_on" in item:
+            for key in item["depends_on"]:
+                if key not in keys:
+                    raise ValueError(
+                        "Item '{}' depends on '{}', which is not declared "
+                        "before it".format(item["label"], key)
+                    )
+                node.deps.add(keys[key])
+        else:
+            node.deps.update(range(index))
+        if item.get("key") is not None:
+            if item["key"] in keys:
+                raise ValueError("Duplicate item key '{}'".format(item["key"]))
+            keys[item["key"]] = index
+        nodes.append(node)
+
+    for node in nodes:
+        node.pending = len(node.deps)
+        for dep in node.deps:
+            nodes[dep].dependents.append(node)
+    return nodes
+
+
+class _Scheduler:
+    """
+    Submit nodes to a thread pool as soon as their dependencies complete.
+
+    Nodes of items without "depends_on" depend on every earlier node (see
+    _build_graph), so only items that declare their dependencies, even an
+    empty list, run alongside the items before them.
+
+    A failed "fatal" item cancels the futures of the nodes that were not
+    submitted yet, and their items are reported as skipped. Nodes that are
+    already running are not interrupted: they run to completion and their
+    results are reported, but nothing is submitted after them.
+    """
+
+    def __init__(self, nodes, workers):
+        self.nodes = nodes
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.aborted = False
+
+    def start(self):
+        with self.lock:
+            for node in self.nodes:
+                if node.pending == 0:
+                    self._submit(node)
+
+    def stop(self):
+        with self.lock:
+            self._abort()
+        self.pool.shutdown(wait=True)
+
+    def _submit(self, node):
+        node.submitted = True
+        self.pool.submit(self._run, node)
+
+    def _abort(self):
+        self.aborted = True
+        for node in self.nodes:
+            if not node.submitted:
+                node.future.cancel()
+
+    def _run(self, node):
+        logging.debug("executor: start '{}'".format(node.item["label"]))
+        failed = True
+        try:
+            result = node.task(node.item)
+            failed = result if result is not None else node.item.get("failed", False)
+            node.future.set_result(result)
+        except BaseException as e:
+            node.future.set_exception(e)
+        logging.debug("executor: done '{}'".format(node.item["label"]))
+
+        with self.lock:
+            if failed and node.item.get("fatal", False):
+                self._abort()
+            if self.aborted:
+                return
+            for dependent in node.dependents:
+                dependent.pending -= 1
+                if dependent.pending == 0 and not dependent.submitted:
+                    self._submit(dependent)
+
+
+class Console(userinterface.Console):
+    """
+    userinterface.Console that runs independent items concurrently
+    """
+
+    def __init__(self, items, *args, workers=None, **kwargs):
+        playbooks.coalesce(items)
+        super().__init__(items, *args, **kwargs)
+        self.dag_items = items
+        if workers is None:
+            workers = session.workers(MAX_WORKERS)
+        self.workers = max(1, workers)
+
+    def run_items(self, *args, **kwargs):
+        nodes = _build_graph(self.dag_items)
+        scheduler = _Scheduler(nodes, self.workers)
+
+        # The base class calls every task in list order; each call only
+        # waits for the result computed in the background.
+        for node in nodes:
+            node.item["task"] = self._waiter(node)
+        scheduler.start()
+        try:
+            return super().run_items(*args, **kwargs)
+        finally:
+            scheduler.stop()
+            for node in nodes:
+                node.item["task"] = node.task
+
+    @staticmethod
+    def _waiter(node):
+        def wait(item):
+            try:
+                return node.future.result()
+            except CancelledError:
+                item["failed"] = True
+                item["msgs"] = [{"text": "Skipped after a fatal error"}]
+                return item["failed"]
+        return wait
@@ -0,0 +1,165 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Metadata-only existence checks for the DO370 lab scripts.
+
+resource_exists() fetches whole objects to learn whether they exist, so
+checking that an OpenShift Template is absent downloads the entire template.
+exists() asks the API server for a PartialObjectMetadata instead, and
+existing() answers for several names of one kind with a single metadata-only
+LIST, using a field selector when there is only one name.
+
+absence_task() returns the item task of the "is not present" checks of the
+labs. Labs that check several objects of one kind register those items with
+the expect() method of a Lookup created for the run, and pass the Lookup to
+absence_task(): the first check of the kind then lists it once for all the
+registered names, and the following checks use that answer.
+"""
+
+import logging
+import threading
+
+from kubernetes.dynamic.exceptions import NotFoundError, ResourceNotFoundError
+
+# Objects and lists of objects reduced to their metadata, with the full
+# objects as a fallback for API servers that cannot convert them
+METADATA = (
+    "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,"
+    "application/json"
+)
+METADATA_LIST = (
+    "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,"
+    "application/json"
+)
+
+# Page size of the metadata-only lists
+PAGE_SIZE = 500
+
+
+def get(oc_client, api_version, kind, name, namespace=None):
+    """
+    Return the metadata of an object, or None if it does not exist
+    """
+    try:
+        resource = oc_client.resources.get(api_version=api_version, kind=kind)
+        obj = resource.get(
+            name=name,
+            namespace=namespace or None,
+            header_params={"Accept": METADATA},
+        )
+    except (NotFoundError, ResourceNotFoundError):
+        return None
+    return obj.to_dict()["metadata"]
+
+
+def existing(oc_client, api_version, kind, names, namespace=None):
+    """
+    Return the subset of names that exist, from one metadata-only LIST
+    """
+    names = set(names)
+    try:
+        resource = oc_client.resources.get(api_version=api_version, kind=kind)
+    except ResourceNotFoundError:
+        return set()
+    field_selector = None
+    if len(names) == 1:
+        field_selector = "metadata.name={}".format(next(iter(names)))
+    logging.info("List {} in {}".format(kind, namespace or "cluster"))
+    found = set()
+    token = None
+    while True:
+        listing = resource.get(
+            namespace=namespace or None,
+            field_selector=field_selector,
+            limit=PAGE_SIZE,
+            _continue=token,
+            header_params={"Accept": METADATA_LIST},
+        ).to_dict()
+        found.update(obj["metadata"]["name"] for obj in listing["items"])
+        token = listing["metadata"].get("continue")
+        if not token:
+            return found & names
+
+
+class Lookup:
+    """
+    Existence answers for the absence checks of one lab run. The checks of
+    one kind and namespace registered with expect() share a single LIST.
+    """
+
+    def __init__(self, oc_client):
+        self.oc_client = oc_client
+        self.pending = {}
+        self.answers = {}
+        self.lock = threading.Lock()
+
+    def expect(self, items):
+        """
+        Register the objects that items with "api", "type" and "name" keys
+        will check
+        """
+        with self.lock:
+            for item in items:
+                if not all(key in item for key in ("api", "type", "name")):
+                    continue
+                key = (item["api"], item["type"], item.get("namespace") or None)
+                self.pending.setdefault(key, set()).add(item["name"])
+
+    def exists(self, api_version, kind, name, namespace=None):
+        """
+        Return whether the object exists. Each answer from a shared LIST is
+        used once, so checking the same object again asks the server.
+        """
+        key = (api_version, kind, namespace or None)
+        with self.lock:
+            answers = self.answers.get(key, {})
+            if name in answers:
+                return answers.pop(name)
+            names = self.pending.get(key, set())
+            if name in names:
+                del self.pending[key]
+        if name in names and len(names) > 1:
+            found = existing(self.oc_client, api_version, kind, names, namespace)
+            with self.lock:
+                self.answers.setdefault(key, {}).update(
+                    (other, other in found) for other in names if other != name
+                )
+            return name in found
+        return exists(self.oc_client, api_version, kind, name, namespace)
+
+
+def exists(oc_client, api_version, kind, name, namespace=None):
+    """
+    Return whether the object exists
+    """
+    return get(oc_client, api_version, kind, name, namespace) is not None
+
+
+def fail_if_exists(lab, item, lookup=None):
+    """
+    Fail item when the object named by its "api", "type", "name" and
+    "namespace" keys exists
+    """
+    if lookup is None:
+        lookup = Lookup(lab.oc_client)
+    item["failed"] = False
+    if lookup.exists(item["api"], item["type"], item["name"], item.get("namespace")):
+        item["failed"] = True
+        item["msgs"] = [{"text":
+            "The {} {} already exists, please ".format(item["name"], item["type"]) +
+            "delete it or run 'lab finish {}' ".format(lab.__LAB__) +
+            "before starting this GE"}]
+    return item["failed"]
+
+
+def absence_task(lab, lookup=None):
+    """
+    Return an item task that runs fail_if_exists() for lab
+    """
+    def task(item):
+        return fail_if_exists(lab, item, lookup)
+    return task
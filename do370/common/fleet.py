@@ -0,0 +1,247 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Grade one lab on a whole classroom of clusters.
+
+    python -m do370.common.fleet comprehensive-review inventory.yaml \\
+        --output results.json
+
+The inventory lists the clusters to grade:
+
+    clusters:
+      - name: student01
+        host: api.student01.example.com
+        port: 6443
+        user: admin
+        password: redhat
+        env:                  # optional, extra environment variables
+          SOME_VAR: value
+
+Lab classes read the API host, port and credentials from environment
+variables when their module is imported, so every cluster is graded by its
+own Python process started with the cluster environment. At most --workers
+graders run at the same time, and a grader that exceeds --timeout is killed
+and reported as "timeout". The results are written as JSON, or as CSV when
+the output file name ends with ".csv".
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import tempfile
+import importlib
+import subprocess
+import yaml
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of graders running at the same time
+MAX_WORKERS = 16
+
+# Default time limit of a single grader, in seconds
+TIMEOUT = 300
+
+# Number of output lines kept when a grader fails
+_OUTPUT_TAIL = 20
+
+
+def load_inventory(path):
+    with open(path) as input_file:
+        inventory = yaml.load(input_file, Loader=yaml.SafeLoader)
+    clusters = inventory.get("clusters") or []
+    names = [cluster["name"] for cluster in clusters]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate cluster names in {}".format(path))
+    return clusters
+
+
+def cluster_env(cluster):
+    """
+    Return the environment of the grader process for cluster
+    """
+    env = dict(os.environ)
+    env["OCP_HOST"] = str(cluster["host"])
+    env["OCP_PORT"] = str(cluster.get("port", 6443))
+    # Labs read the credentials from either set of variables
+    for prefix in ("OCP_", "RHT_OCP4_DEV_"):
+        if "user" in cluster:
+            env[prefix + "USER"] = str(cluster["user"])
+        if "password" in cluster:
+            env[prefix + "PASSWORD"] = str(cluster["password"])
+    for key, value in (cluster.get("env") or {}).items():
+        env[key] = str(value)
+    return env
+
+
+def _tail(output):
+    return "\n".join((output or "").splitlines()[-_OUTPUT_TAIL:])
+
+
+def grade_cluster(lab_name, cluster, timeout):
+    """
+    Run the grader of lab_name against cluster in a child process
+    """
+    result = {
+        "cluster": cluster["name"],
+        "status": "error",
+        "seconds": 0.0,
+        "items": [],
+        "error": None,
+    }
+    fd, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    start = time.monotonic()
+    try:
+        process = subprocess.run(
+            [sys.executable, "-m", "do370.common.fleet", lab_name,
+             "--worker", result_path],
+            env=cluster_env(cluster),
+            timeout=timeout,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        try:
+            with open(result_path) as input_file:
+                result["items"] = json.load(input_file)
+        except (OSError, ValueError):
+            result["error"] = "Grader exited with status {}:\n{}".format(
+                process.returncode, _tail(process.stdout)
+            )
+        else:
+            failed = any(item["failed"] for item in result["items"])
+            result["status"] = "failed" if failed else "passed"
+    except subprocess.TimeoutExpired:
+        result["status"] = "timeout"
+        result["error"] = "Grading took more than {}s".format(timeout)
+    finally:
+        result["seconds"] = round(time.monotonic() - start, 2)
+        os.remove(result_path)
+    logging.info(
+        "{}: {} in {}s".format(result["cluster"], result["status"], result["seconds"])
+    )
+    return result
+
+
+def grade(lab_name, clusters, workers=MAX_WORKERS, timeout=TIMEOUT):
+    """
+    Grade every cluster, return the results in inventory order
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(grade_cluster, lab_name, cluster, timeout)
+            for cluster in clusters
+        ]
+        return [future.result() for future in futures]
+
+
+def write_results(results, path):
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(["cluster", "status", "seconds", "failed_checks", "error"])
+            for result in results:
+                writer.writerow([
+                    result["cluster"],
+                    result["status"],
+                    result["seconds"],
+                    "; ".join(
+                        item["label"] for item in result["items"] if item["failed"]
+                    ),
+                    result["error"] or "",
+                ])
+    else:
+        with open(path, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+def lab_class(module, lab_name):
+    for value in vars(module).values():
+        if isinstance(value, type) and getattr(value, "__LAB__", None) == lab_name:
+            return value
+    raise LookupError("No lab class for {}".format(lab_name))
+
+
+def _run_worker(lab_name, result_path):
+    """
+    Grade the cluster of the current environment and save the item results
+    """
+    from labs.common import userinterface
+
+    consoles = []
+
+    class RecordingConsole(userinterface.Console):
+        def __init__(self, items, *args, **kwargs):
+            super().__init__(items, *args, **kwargs)
+            consoles.append(items)
+
+    # Patched before the lab module is imported, so that consoles derived
+    # from it, such as do370.common.executor.Console, record their items too
+    userinterface.Console = RecordingConsole
+    module = importlib.import_module("do370.{}".format(lab_name))
+    lab = lab_class(module, lab_name)()
+    try:
+        lab.grade()
+    except SystemExit:
+        # The console may exit with the grading status
+        pass
+
+    items = []
+    for console_items in consoles:
+        for item in console_items:
+            items.append({
+                "label": item.get("label"),
+                # Items that did not run, for example after a fatal failure,
+                # count as failed
+                "failed": bool(item.get("failed", True)),
+                "msgs": [msg.get("text") for msg in item.get("msgs") or []],
+            })
+    with open(result_path, "w") as output_file:
+        json.dump(items, output_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m do370.common.fleet",
+        description="Grade a lab on every cluster of an inventory",
+    )
+    parser.add_argument("lab", help="lab name, for example comprehensive-review")
+    parser.add_argument("inventory", nargs="?", help="inventory YAML file")
+    parser.add_argument("--output", default="results.json",
+                        help="result file, JSON or CSV (default: results.json)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="graders running at the same time")
+    parser.add_argument("--timeout", type=int, default=TIMEOUT,
+                        help="time limit per cluster, in seconds")
+    parser.add_argument("--worker", metavar="RESULT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _run_worker(args.lab, args.worker)
+        return 0
+    if not args.inventory:
+        parser.error("the inventory file is required")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    clusters = load_inventory(args.inventory)
+    start = time.monotonic()
+    results = grade(args.lab, clusters, workers=args.workers, timeout=args.timeout)
+    write_results(results, args.output)
+    passed = sum(1 for result in results if result["status"] == "passed")
+    print("{}/{} clusters passed in {:.1f}s, results in {}".format(
+        passed, len(results), time.monotonic() - start, args.output
+    ))
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
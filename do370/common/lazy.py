@@ -0,0 +1,110 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Deferred imports and import time profiling for the DO370 lab scripts.
+
+The lab loader imports the module of the requested lab before the first task
+runs, so every module level import is paid even by labs that never use it.
+Modules that ocp.utils imports anyway (kubernetes, yaml, urllib3) cost
+nothing more once the lab class is loaded and are imported normally.
+Modules that are only needed by some code paths are declared with:
+
+    asyncio = lazy.module("asyncio")
+
+and imported the first time one of their attributes is accessed.
+
+Set DO370_PROFILE_IMPORTS to any non-empty value to print, when the lab
+command exits, the modules imported after the do370 package was loaded with
+the time spent importing each one (excluding its own imports). Modules the
+lab command imported earlier are not listed, use "python -X importtime" for
+those.
+"""
+
+import sys
+import time
+import atexit
+import builtins
+import threading
+
+
+class _LazyModule:
+    """
+    Stand-in for a module that imports it on first attribute access
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            # Go through __import__ so the import shows up in the profile,
+            # the import lock makes concurrent first uses safe
+            __import__(self._name)
+            module = sys.modules[self._name]
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] else "not loaded"
+        return "<lazy module '{}' ({})>".format(self._name, state)
+
+
+def module(name):
+    """
+    Return name from sys.modules if already imported, a lazy stand-in otherwise
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+# Import time profiling
+
+_timings = {}
+_local = threading.local()
+_original_import = builtins.__import__
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        _timings[name] = _timings.get(name, 0.0) + elapsed - children
+        if stack:
+            stack[-1] += elapsed
+
+
+def _report():
+    total = sum(_timings.values())
+    sys.stderr.write("Import time (self, ms)   module\n")
+    for name, seconds in sorted(
+        _timings.items(), key=lambda entry: entry[1], reverse=True
+    ):
+        sys.stderr.write("{:>22.1f}   {}\n".format(seconds * 1000, name))
+    sys.stderr.write("{:>22.1f}   total\n".format(total * 1000))
+
+
+def profile_imports():
+    """
+    Record the time spent importing modules and report it at exit
+    """
+    if builtins.__import__ is _profiled_import:
+        return
+    builtins.__import__ = _profiled_import
+    atexit.register(_report)
@@ -0,0 +1,351 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Bulk apply engine for multi-document lab resource files.
+
+The lab scripts create the objects of a solutions YAML file one by one and
+stop at the first error. apply() parses the documents once, creates the
+cluster-scoped objects (namespaces and projects included) first and then
+sends every namespaced object concurrently. Objects are sent with server-side
+apply, so running a start twice does not depend on ConflictError handling.
+When fields were changed by another manager, the apply is forced: the
+documents describe the lab's own objects. Projects are created instead,
+because OpenShift answers an apply for a project that does not exist yet
+with NotFound, and kinds that do not support apply fall back to the same
+create, which tolerates existing objects. The objects of a namespace or
+project that could not be created are reported as failed without being
+sent.
+
+converge() is the incremental variant used by "lab start" when
+DO370_CONVERGE is set: it lists what already exists and only sends the
+objects that are missing or differ from the documents, so starting a lab
+that is half set up does not need a finish first.
+
+Every object gets a result entry, which report() turns into Console lines.
+"""
+
+import os
+import base64
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from do370.common import materials, session
+
+# Field manager recorded in the managedFields of applied objects
+FIELD_MANAGER = "do370-lab"
+
+# Status codes returned by kinds that do not accept apply patches
+_APPLY_UNSUPPORTED = (405, 415)
+
+# Kinds that are always created, never applied
+_CREATE_ONLY = ("project.openshift.io/v1", "Project")
+
+# Kinds whose failure prevents creating the namespaced objects they hold
+_NAMESPACE_KINDS = ("Namespace", "Project")
+
+
+def load(path):
+    """
+    Return the list of documents in a YAML file, skipping empty ones.
+    Parsed files are cached, see do370.common.materials.
+    """
+    return materials.load(path)
+
+
+def _result(element, namespace, status, error=None):
+    return {
+        "kind": element["kind"],
+        "name": element["metadata"]["name"],
+        "namespace": namespace,
+        "status": status,
+        "error": error,
+    }
+
+
+def _create(resource, element, namespace):
+    try:
+        resource.create(body=element, namespace=namespace)
+        return "created"
+    except Exception as e:
+        if e.__class__.__name__ == "ConflictError":
+            logging.info("Element already exists")
+            return "unchanged"
+        raise
+
+
+def _server_side_apply(oc_client, resource, element, namespace, force=False):
+    oc_client.server_side_apply(
+        resource,
+        body=element,
+        name=element["metadata"]["name"],
+        namespace=namespace,
+        field_manager=FIELD_MANAGER,
+        force_conflicts=force or None,
+    )
+
+
+def _apply_one(oc_client, resource, element, namespace):
+    name = element["metadata"]["name"]
+    logging.info("Apply {}/{}".format(element["kind"], name))
+    try:
+        if (
+            not hasattr(oc_client, "server_side_apply")
+            or (element["apiVersion"], element["kind"]) == _CREATE_ONLY
+        ):
+            # Client too old to support server-side apply, or a project
+            return _result(
+                element, namespace, _create(resource, element, namespace)
+            )
+        try:
+            _server_side_apply(oc_client, resource, element, namespace)
+            status = "applied"
+        except Exception as e:
+            if getattr(e, "status", None) in _APPLY_UNSUPPORTED:
+                status = _create(resource, element, namespace)
+            elif e.__class__.__name__ == "ConflictError":
+                # The documents are the lab's own objects: take over the
+                # fields another manager changed, or report the failure
+                logging.info("Conflict on {}/{}, forcing".format(element["kind"], name))
+                _server_side_apply(oc_client, resource, element, namespace, force=True)
+                status = "applied"
+            else:
+                raise
+        return _result(element, namespace, status)
+    except Exception as e:
+        logging.debug("{}: {}".format(e.__class__.__name__, e))
+        return _result(
+            element, namespace, "failed",
+            {"name": e.__class__.__name__, "message": str(e)},
+        )
+
+
+def _targets(oc_client, documents, namespace, results):
+    """
+    Resolve the resource of every document. Return the cluster-scoped and
+    the namespaced (index, resource, element, namespace) tuples, and record
+    a failed result for the documents whose kind is unknown.
+    """
+    cluster_scoped = []
+    namespaced = []
+    for index, element in enumerate(documents):
+        try:
+            resource = oc_client.resources.get(
+                api_version=element["apiVersion"], kind=element["kind"]
+            )
+        except Exception as e:
+            results[index] = _result(
+                element, None, "failed",
+                {"name": e.__class__.__name__, "message": str(e)},
+            )
+            continue
+        if resource.namespaced:
+            target = element["metadata"].get("namespace", namespace)
+            namespaced.append((index, resource, element, target))
+        else:
+            cluster_scoped.append((index, resource, element, None))
+    return cluster_scoped, namespaced
+
+
+def _failed_namespaces(results):
+    return {
+        result["name"] for result in results
+        if result is not None
+        and result["kind"] in _NAMESPACE_KINDS
+        and result["status"] == "failed"
+    }
+
+
+def _apply_tiers(pool, oc_client, tiers, results):
+    # Namespaces must exist before the objects they contain
+    for tier in tiers:
+        failed_namespaces = _failed_namespaces(results)
+        futures = []
+        for index, resource, element, target in tier:
+            if target in failed_namespaces:
+                results[index] = _result(
+                    element, target, "failed",
+                    {"name": "Skipped", "message":
+                        "The {} namespace could not be created".format(target)},
+                )
+                continue
+            futures.append(
+                (index, pool.submit(_apply_one, oc_client, resource, element, target))
+            )
+        for index, future in futures:
+            results[index] = future.result()
+
+
+def apply(oc_client, documents, namespace=None, workers=None):
+    """
+    Apply documents and return one result dictionary per document.
+
+    namespace is used for namespaced documents that do not declare one.
+    """
+    if workers is None:
+        workers = session.workers()
+
+    results = [None] * len(documents)
+    tiers = _targets(oc_client, documents, namespace, results)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        _apply_tiers(pool, oc_client, tiers, results)
+    return results
+
+
+# Converge mode
+
+def converging():
+    """
+    Return True when lab start should converge instead of starting clean
+    """
+    return bool(os.environ.get("DO370_CONVERGE"))
+
+
+def converge_items(items):
+    """
+    Return items without the ones marked "converge": False, which only make
+    sense for a clean start (teardown and "is not present" checks)
+    """
+    dropped = {item.get("key") for item in items if not item.get("converge", True)}
+    kept = [item for item in items if item.get("converge", True)]
+    for item in kept:
+        # Items that waited for a dropped item wait for every earlier item
+        if dropped.intersection(item.get("depends_on", ())):
+            del item["depends_on"]
+    return kept
+
+
+def _contains(live, desired):
+    """
+    Return True if every field of desired has the same value in live
+    """
+    if isinstance(desired, dict):
+        return isinstance(live, dict) and all(
+            _contains(live.get(key), value) for key, value in desired.items()
+        )
+    if isinstance(desired, list):
+        return (
+            isinstance(live, list)
+            and len(live) == len(desired)
+            and all(_contains(*pair) for pair in zip(live, desired))
+        )
+    # The API returns some declared strings as numbers and the other way
+    return live == desired or str(live) == str(desired)
+
+
+def _readable(element):
+    """
+    Return element with its write-only fields replaced by the fields the API
+    returns: the stringData of a Secret is stored base64 encoded in data
+    """
+    if not element.get("stringData"):
+        return element
+    readable = dict(element)
+    # stringData wins over data for the keys they have in common
+    data = dict(readable.get("data") or {})
+    for key, value in readable.pop("stringData").items():
+        data[key] = base64.b64encode(str(value).encode("utf-8")).decode("ascii")
+    readable["data"] = data
+    return readable
+
+
+def _drifted(element, live):
+    """
+    Return True if the live object differs from the declared element.
+    Only declared fields are compared, and only the labels and annotations
+    of the metadata.
+    """
+    for key, value in _readable(element).items():
+        if key in ("apiVersion", "kind", "status"):
+            continue
+        if key == "metadata":
+            for field in ("labels", "annotations"):
+                if not _contains(live["metadata"].get(field) or {}, value.get(field) or {}):
+                    return True
+        elif not _contains(live.get(key), value):
+            return True
+    return False
+
+
+def _list(resource, namespace):
+    logging.info("List {} in {}".format(resource.kind, namespace or "cluster"))
+    listing = resource.get(namespace=namespace).to_dict()
+    return {obj["metadata"]["name"]: obj for obj in listing["items"]}
+
+
+def converge(oc_client, documents, namespace=None, workers=None):
+    """
+    Bring the cluster to the state declared by documents with the fewest
+    requests: every kind is listed once per namespace, missing objects are
+    created, drifted objects are applied again and the others are skipped.
+
+    Return one result dictionary per document, with status "created",
+    "patched", "unchanged" or "failed".
+    """
+    if workers is None:
+        workers = session.workers()
+
+    results = [None] * len(documents)
+    tiers = _targets(oc_client, documents, namespace, results)
+    groups = {}
+    for tier in tiers:
+        for target in tier:
+            index, resource, element, target_namespace = target
+            key = (element["apiVersion"], element["kind"], target_namespace)
+            groups.setdefault(key, (resource, []))[1].append(target)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        listings = {
+            key: pool.submit(_list, resource, key[2])
+            for key, (resource, members) in groups.items()
+        }
+        changes = {}
+        for key, (resource, members) in groups.items():
+            try:
+                live = listings[key].result()
+            except Exception as e:
+                # Apply every object of a kind that cannot be listed
+                logging.debug("Could not list {}: {}".format(key[1], e))
+                live = {}
+            for index, resource, element, target_namespace in members:
+                current = live.get(element["metadata"]["name"])
+                if current is None:
+                    changes[index] = "created"
+                elif _drifted(element, current):
+                    changes[index] = "patched"
+                else:
+                    results[index] = _result(element, target_namespace, "unchanged")
+
+        _apply_tiers(
+            pool, oc_client,
+            [[target for target in tier if target[0] in changes] for tier in tiers],
+            results,
+        )
+    for index, change in changes.items():
+        # Objects that cannot be patched, such as projects, stay "unchanged"
+        if results[index]["status"] in ("applied", "created"):
+            results[index]["status"] = change
+    return results
+
+
+def failed(results):
+    return any(result["status"] == "failed" for result in results)
+
+
+def report(results):
+    """
+    Return Console messages with one line per object, and log them as a table
+    """
+    msgs = []
+    for result in results:
+        line = "{:<10} {}/{}".format(
+            result["status"], result["kind"], result["name"]
+        )
+        if result["error"]:
+            line += ": {}".format(result["error"]["name"])
+        logging.info(line)
+        msgs.append({"text": line})
+    return msgs
@@ -0,0 +1,165 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Compiled cache of the YAML and JSON files shipped in do370/materials.
+
+Lab scripts parse the same resource files on every start and finish. load()
+parses a file once, checks that every document looks like a Kubernetes
+object, and stores the result as a pickle under ~/.cache/do370/materials.
+The entry records the size, mtime and SHA256 of the source file: it is used
+as is while size and mtime match, and revalidated against the hash when they
+do not, so touching a file does not force a new parse. YAML is parsed with
+the libyaml based CSafeLoader when PyYAML was built with it.
+
+Each call returns freshly unpickled documents, so callers may modify them.
+
+    materials.documents("backup-review", "resources.yaml")
+
+returns the documents of materials/solutions/backup-review/resources.yaml.
+Run "python -m do370.common.materials" to compile every file in advance.
+"""
+
+import os
+import sys
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+import yaml
+
+from do370.common import cache
+
+MATERIALS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "materials"
+)
+
+CACHE_DIR = os.path.join(cache.CACHE_DIR, "materials")
+
+# Bump when the format of the cache entries changes
+_VERSION = 1
+
+_EXTENSIONS = (".yaml", ".yml", ".json")
+
+
+def _parse(path, content):
+    if path.endswith(".json"):
+        documents = [json.loads(content.decode("utf-8"))]
+    else:
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        documents = list(yaml.load_all(content, Loader=loader))
+    documents = [element for element in documents if element]
+    for index, element in enumerate(documents):
+        if not (
+            isinstance(element, dict)
+            and element.get("apiVersion")
+            and element.get("kind")
+            and isinstance(element.get("metadata"), dict)
+        ):
+            raise ValueError(
+                "{}: document {} is not a Kubernetes object".format(path, index)
+            )
+    return documents
+
+
+def _entry_path(path):
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, "{}.pickle".format(digest))
+
+
+def _read_entry(entry_path):
+    try:
+        with open(entry_path, "rb") as input_file:
+            entry = pickle.load(input_file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != _VERSION:
+        return None
+    return entry
+
+
+def _write_entry(entry_path, entry):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "wb") as output_file:
+            pickle.dump(entry, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+    except OSError as e:
+        logging.debug("Could not write cache {}: {}".format(entry_path, e))
+
+
+def load(path):
+    """
+    Return the list of documents in a YAML or JSON file, skipping empty ones
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    entry_path = _entry_path(path)
+    entry = None if os.environ.get("DO370_NO_CACHE") else _read_entry(entry_path)
+
+    if (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime"] == stat.st_mtime_ns
+    ):
+        return pickle.loads(entry["documents"])
+
+    with open(path, "rb") as input_file:
+        content = input_file.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    if entry is not None and entry["sha256"] == sha256:
+        documents = entry["documents"]
+    else:
+        logging.debug("Compile {}".format(path))
+        documents = pickle.dumps(
+            _parse(path, content), protocol=pickle.HIGHEST_PROTOCOL
+        )
+    _write_entry(entry_path, {
+        "version": _VERSION,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "sha256": sha256,
+        "documents": documents,
+    })
+    return pickle.loads(documents)
+
+
+def path(lab_name, filename, section="solutions"):
+    """
+    Return the path of a materials file, section is "solutions" or "labs"
+    """
+    return os.path.join(MATERIALS_DIR, section, lab_name, filename)
+
+
+def documents(lab_name, filename, section="solutions"):
+    """
+    Return the pre-parsed documents of a materials file of a lab
+    """
+    return load(path(lab_name, filename, section))
+
+
+def compile_all():
+    """
+    Compile every materials file, return the number of files compiled
+    """
+    count = 0
+    for root, _, filenames in os.walk(MATERIALS_DIR):
+        for filename in sorted(filenames):
+            if filename.endswith(_EXTENSIONS):
+                try:
+                    load(os.path.join(root, filename))
+                    count += 1
+                except Exception as e:
+                    logging.warning("Skip {}: {}".format(filename, e))
+    return count
+
+
+if __name__ == "__main__":
+    print("Compiled {} materials files".format(compile_all()))
+    sys.exit(0)
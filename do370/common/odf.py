@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Pre-flight probe for the OpenShift Data Foundation install playbook.
+
+Most lab scripts run ansible/install/install-lso-ocs.yml on every start,
+although ODF is usually installed already. The probe reads the LocalVolumeSet,
+StorageCluster and ClusterServiceVersion state once, reduces it to a
+fingerprint and compares it with the fingerprint of the state the playbook
+would converge to for the requested vars. When both match the playbook is
+skipped and the item is reported as already satisfied.
+
+Set DO370_FORCE_INSTALL to any non-empty value to always run the playbook.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import yaml
+
+PLAYBOOK = "ansible/install/install-lso-ocs.yml"
+
+# Variables of the utility host consumed by the playbook
+_HOST_VARS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "ansible", "inventory", "host_vars", "utility",
+)
+
+
+def _load_host_vars():
+    with open(_HOST_VARS) as input_file:
+        return yaml.load(input_file, Loader=yaml.SafeLoader)
+
+
+def _fingerprint(state):
+    content = json.dumps(state, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def desired_state(extra_vars=None):
+    """
+    Return the state the playbook converges to for the given extra vars
+    """
+    extra_vars = extra_vars or {}
+    host_vars = _load_host_vars()
+    volumeset = host_vars["localvolumeset"]
+    cluster = host_vars["storagecluster"]
+    max_device_count = extra_vars.get("max_device_count")
+    return {
+        "localvolumeset": {
+            "storageClassName": volumeset["storageClassName"],
+            "volumeMode": volumeset["volumeMode"],
+            "maxDeviceCount": (
+                None if max_device_count is None else str(max_device_count)
+            ),
+        },
+        "storagecluster": {
+            "phase": "Ready",
+            "storageClassName": volumeset["storageClassName"],
+            "count": int(cluster["storageDeviceSets"]["count"]),
+            "replica": int(cluster["replica"]),
+        },
+        "operators": {
+            host_vars["operators"][name]["name"]: "Succeeded"
+            for name in ("lso", "ocs")
+        },
+    }
+
+
+def observed_state(oc_client):
+    """
+    Read the ODF resources from the cluster and return them in the same
+    shape as desired_state()
+    """
+    host_vars = _load_host_vars()
+    lso = host_vars["operators"]["lso"]
+    ocs = host_vars["operators"]["ocs"]
+
+    def list_items(api_version, kind, namespace):
+        logging.info("List {} in {}".format(kind, namespace))
+        return oc_client.resources.get(
+            api_version=api_version, kind=kind
+        ).get(namespace=namespace).to_dict()["items"]
+
+    volumesets = list_items(
+        "local.storage.openshift.io/v1alpha1", "LocalVolumeSet",
+        lso["namespace"]["name"],
+    )
+    clusters = list_items(
+        "ocs.openshift.io/v1", "StorageCluster", ocs["namespace"]["name"],
+    )
+    csvs = []
+    for operator in (lso, ocs):
+        csvs += list_items(
+            "operators.coreos.com/v1alpha1", "ClusterServiceVersion",
+            operator["namespace"]["name"],
+        )
+
+    state = {"localvolumeset": None, "storagecluster": None, "operators": {}}
+
+    # The playbook reuses the first StorageCluster whatever its name is
+    if clusters:
+        spec = clusters[0].get("spec", {})
+        device_sets = spec.get("storageDeviceSets") or [{}]
+        template = device_sets[0].get("dataPVCTemplate", {}).get("spec", {})
+        state["storagecluster"] = {
+            "phase": clusters[0].get("status", {}).get("phase"),
+            "storageClassName": template.get("storageClassName"),
+            "count": device_sets[0].get("count"),
+            "replica": device_sets[0].get("replica"),
+        }
+
+    storage_class = (state["storagecluster"] or {}).get("storageClassName")
+    for volumeset in volumesets:
+        spec = volumeset.get("spec", {})
+        if spec.get("storageClassName") != storage_class:
+            continue
+        max_device_count = spec.get("maxDeviceCount")
+        state["localvolumeset"] = {
+            "storageClassName": spec.get("storageClassName"),
+            "volumeMode": spec.get("volumeMode"),
+            "maxDeviceCount": (
+                None if max_device_count is None else str(max_device_count)
+            ),
+        }
+        break
+
+    for csv in csvs:
+        name = csv["metadata"]["name"]
+        for operator in (lso, ocs):
+            if name.startswith(operator["name"] + "."):
+                phase = csv.get("status", {}).get("phase")
+                # Keep "Succeeded" if any CSV of the operator reached it
+                if state["operators"].get(operator["name"]) != "Succeeded":
+                    state["operators"][operator["name"]] = phase
+
+    return state
+
+
+def is_converged(oc_client, extra_vars=None):
+    """
+    Return True if the cluster already matches what the playbook would do
+    """
+    try:
+        desired = _fingerprint(desired_state(extra_vars))
+        observed = _fingerprint(observed_state(oc_client))
+    except Exception as e:
+        logging.debug("ODF probe failed: {}: {}".format(e.__class__.__name__, e))
+        return False
+    logging.debug("ODF fingerprint desired={} observed={}".format(desired, observed))
+    return desired == observed
+
+
+def install_task(lab):
+    """
+    Return an item task that runs the ODF playbook through lab.run_playbook
+    only when the cluster has not converged yet
+    """
+    def task(item):
+        if not os.environ.get("DO370_FORCE_INSTALL") and is_converged(
+            lab.oc_client, item.get("vars")
+        ):
+            logging.info("OpenShift Data Foundation is already installed")
+            item["failed"] = False
+            item["msgs"] = [{"text": "Already satisfied"}]
+            return item["failed"]
+        return lab.run_playbook(item)
+    return task
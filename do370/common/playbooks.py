@@ -0,0 +1,201 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Coalesced execution of consecutive run_playbook items.
+
+Every run_playbook item starts its own ansible-playbook process, which pays
+for the interpreter startup, the inventory parsing and the connection setup
+again. coalesce() finds runs of adjacent items whose task is the run_playbook
+method of a lab and runs each run as a single playbook that imports the item
+playbooks one after the other. Only items with the same vars are run
+together, and those vars are passed to the combined run, so they keep the
+extra-vars precedence they have when the items run on their own.
+
+A small marker play after every imported playbook records the hosts that
+failed in it, so every item still gets its own result on the Console. After
+a failed "fatal" item the marker stops the run; after a failed non-fatal
+item it clears the host errors so the next playbook runs normally. When
+ansible stops in a playbook, because every host of a play failed, that item
+is reported as failed and the items after it are run on their own.
+
+Environment variables:
+
+    DO370_NO_COALESCE   run every playbook item separately when set
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import yaml
+
+# Directory that item["playbook"] paths are relative to
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ANSIBLE_DIR = os.path.join(PACKAGE_DIR, "ansible")
+
+
+def _is_playbook_item(item):
+    task = item.get("task")
+    return (
+        "playbook" in item
+        and "depends_on" not in item
+        and getattr(task, "__name__", None) == "run_playbook"
+        and getattr(task, "__self__", None) is not None
+    )
+
+
+def _marker(index, item, status_dir):
+    """
+    Return the play that records the hosts that failed in the previous play
+    """
+    tasks = [
+        {
+            "name": "Record the result of '{}'".format(item["label"]),
+            "copy": {
+                "dest": os.path.join(status_dir, "{}.json".format(index)),
+                "content": "{{ do370_failed_hosts | to_json }}",
+            },
+            "delegate_to": "localhost",
+            "run_once": True,
+        },
+    ]
+    play = {
+        "name": "Result of '{}'".format(item["label"]),
+        "hosts": "all",
+        "gather_facts": False,
+        "vars": {
+            "do370_failed_hosts":
+                "{{ ansible_play_hosts_all | difference(ansible_play_hosts) }}",
+        },
+        "tasks": tasks,
+    }
+    if item.get("fatal", False):
+        play["any_errors_fatal"] = True
+        tasks.append({
+            "name": "Stop after a fatal failure",
+            "fail": {"msg": "'{}' failed".format(item["label"])},
+            "when": "do370_failed_hosts | length > 0",
+            "run_once": True,
+        })
+    else:
+        tasks.append({"meta": "clear_host_errors"})
+    return play
+
+
+class _Batch:
+    """
+    Consecutive run_playbook items of one lab, run by one ansible process
+    """
+
+    def __init__(self, lab, items):
+        self.lab = lab
+        self.items = items
+        self.results = {}
+        self.msgs = []
+        self.ran = False
+
+    def task(self, index):
+        def run(item):
+            if index == 0:
+                self._run()
+            if index not in self.results:
+                if not self.ran or index > len(self.results):
+                    # The combined run stopped before this item
+                    return self.lab.run_playbook(item)
+                # The combined run stopped in this item
+                item["failed"] = True
+                item["msgs"] = list(self.msgs)
+                return item["failed"]
+            failed_hosts = self.results[index]
+            item["failed"] = bool(failed_hosts)
+            item["msgs"] = []
+            if item["failed"]:
+                item["msgs"] = list(self.msgs) + [
+                    {"text": "Failed on {}".format(", ".join(failed_hosts))}
+                ]
+            return item["failed"]
+        return run
+
+    def _plays(self, status_dir):
+        plays = []
+        for index, item in enumerate(self.items):
+            plays.append({
+                "import_playbook": os.path.relpath(
+                    os.path.join(PACKAGE_DIR, item["playbook"]), ANSIBLE_DIR
+                ),
+            })
+            plays.append(_marker(index, item, status_dir))
+        return plays
+
+    def _run(self):
+        self.results = {}
+        self.msgs = []
+        self.ran = False
+        status_dir = tempfile.mkdtemp(prefix="do370-playbooks-")
+        try:
+            # The combined playbook lives next to the others so that their
+            # relative paths, roles and ansible.cfg resolve the same way
+            fd, path = tempfile.mkstemp(
+                prefix=".do370-batch-", suffix=".yml", dir=ANSIBLE_DIR
+            )
+        except OSError as e:
+            logging.debug("Could not write the combined playbook: {}".format(e))
+            shutil.rmtree(status_dir, ignore_errors=True)
+            return
+        try:
+            with os.fdopen(fd, "w") as output_file:
+                yaml.safe_dump(self._plays(status_dir), output_file,
+                               default_flow_style=False, sort_keys=False)
+            batch_item = {
+                "label": " + ".join(item["label"] for item in self.items),
+                "playbook": os.path.relpath(path, PACKAGE_DIR),
+                "fatal": any(item.get("fatal", False) for item in self.items),
+            }
+            if self.items[0].get("vars"):
+                batch_item["vars"] = self.items[0]["vars"]
+            logging.info("Running {} playbooks in one ansible process".format(
+                len(self.items)))
+            self.lab.run_playbook(batch_item)
+            self.ran = True
+            self.msgs = batch_item.get("msgs") or []
+            for index in range(len(self.items)):
+                try:
+                    with open(os.path.join(status_dir, "{}.json".format(index))) as input_file:
+                        self.results[index] = json.load(input_file)
+                except (OSError, ValueError):
+                    break
+        finally:
+            os.remove(path)
+            shutil.rmtree(status_dir, ignore_errors=True)
+
+
+def coalesce(items):
+    """
+    Replace the tasks of consecutive run_playbook items, in place, so that
+    every run of two or more of them executes as one ansible process
+    """
+    if os.environ.get("DO370_NO_COALESCE"):
+        return
+    run = []
+    for item in list(items) + [None]:
+        if (
+            item is not None
+            and _is_playbook_item(item)
+            and (not run or (
+                item["task"].__self__ is run[0]["task"].__self__
+                and (item.get("vars") or {}) == (run[0].get("vars") or {})
+            ))
+        ):
+            run.append(item)
+            continue
+        if len(run) > 1:
+            batch = _Batch(run[0]["task"].__self__, run)
+            for index, member in enumerate(run):
+                member["task"] = batch.task(index)
+        run = [item] if item is not None and _is_playbook_item(item) else []
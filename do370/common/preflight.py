@@ -0,0 +1,169 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Concurrent pre-flight checks for the DO370 lab scripts.
+
+Labs start by checking the lab hosts, pinging the API host, probing the API
+endpoint and reading the cluster version, one item after the other. Each
+check has its own timeout, so an unreachable host costs the sum of them.
+
+stage() turns such items into one pre-flight stage: the first item launches
+every probe at once on an asyncio loop, with one shared deadline, and each
+item then reports the result of its own probe as a separate Console line.
+The probes are the original item tasks, run in daemon threads so that a
+probe stuck past the deadline does not keep the lab waiting. Successful
+probes are cached for a short time, so labs run back to back skip them.
+
+Environment variables:
+
+    DO370_PREFLIGHT_TIMEOUT   shared deadline of the probes, in seconds (60)
+    DO370_PREFLIGHT_TTL       seconds a successful probe stays valid (120)
+"""
+
+import json
+import time
+import logging
+import threading
+
+from do370.common import cache, lazy, settings
+
+# Only the labs that run the probes pay for importing asyncio
+asyncio = lazy.module("asyncio")
+
+# Default shared deadline of the probes, in seconds
+TIMEOUT = 60
+
+# Default validity of a successful probe, in seconds
+TTL = 120
+
+
+def _key(item, task):
+    """
+    Return the cache key of a probe: its task and the targets it checks
+    """
+    target = {key: item[key] for key in ("hosts", "host", "port") if key in item}
+    lab = getattr(task, "__self__", None)
+    if lab is not None:
+        target["api"] = getattr(lab, "OCP_API", {}).get("host")
+    return "{}:{}".format(task.__name__, json.dumps(target, sort_keys=True, default=str))
+
+
+def _run_probe(item, task):
+    """
+    Run task on a copy of item and return the copy
+    """
+    probe = dict(item, task=task)
+    try:
+        result = task(probe)
+        probe["failed"] = bool(result if result is not None else probe.get("failed", True))
+    except Exception as e:
+        probe["failed"] = True
+        probe.setdefault("msgs", [{"text": "{} failed".format(item["label"])}])
+        probe["exception"] = {
+            "name": e.__class__.__name__,
+            "message": str(e),
+        }
+    return probe
+
+
+def _resolve(future, probe):
+    # The future is cancelled when the probe missed the deadline
+    if not future.done():
+        future.set_result(probe)
+
+
+async def _probe(item, task, timeout):
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def run():
+        probe = _run_probe(item, task)
+        try:
+            loop.call_soon_threadsafe(_resolve, future, probe)
+        except RuntimeError:
+            # The stage is over and its loop closed
+            pass
+
+    threading.Thread(target=run, name=item["label"], daemon=True).start()
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return dict(
+            item, task=task, failed=True,
+            msgs=[{"text": "No answer within {}s".format(timeout)}],
+        )
+
+
+async def _run_all(probes, timeout):
+    return await asyncio.gather(
+        *(_probe(item, task, timeout) for item, task in probes)
+    )
+
+
+class _Stage:
+    """
+    Pre-flight items whose probes run together
+    """
+
+    def __init__(self, items, timeout, ttl):
+        self.items = items
+        self.tasks = [item["task"] for item in items]
+        self.timeout = timeout
+        self.ttl = ttl
+        self.results = None
+
+    def task(self, index):
+        def run(item):
+            if self.results is None:
+                self._run()
+            for key, value in self.results[index].items():
+                if key in ("failed", "msgs", "exception"):
+                    item[key] = value
+            return item["failed"]
+        return run
+
+    def _run(self):
+        passed = cache.TTLCache("preflight", self.ttl)
+        self.results = [None] * len(self.items)
+        pending = []
+        for index, (item, task) in enumerate(zip(self.items, self.tasks)):
+            key = _key(item, task)
+            if passed.get(key):
+                logging.info("{} succeeded recently".format(item["label"]))
+                self.results[index] = {"failed": False, "msgs": []}
+            else:
+                pending.append((index, key))
+        if not pending:
+            return
+
+        start = time.monotonic()
+        probes = asyncio.run(_run_all(
+            [(self.items[index], self.tasks[index]) for index, key in pending],
+            self.timeout,
+        ))
+        logging.info("Pre-flight checks took {:.2f}s".format(time.monotonic() - start))
+        for (index, key), probe in zip(pending, probes):
+            self.results[index] = probe
+            if probe["failed"]:
+                passed.invalidate(key)
+            else:
+                passed.put(key, True)
+
+
+def stage(items, timeout=None, ttl=None):
+    """
+    Return items with their tasks replaced, so that the probes of all of
+    them run concurrently when the first one is reached
+    """
+    if timeout is None:
+        timeout = settings.integer("DO370_PREFLIGHT_TIMEOUT", TIMEOUT, minimum=1)
+    if ttl is None:
+        ttl = settings.integer("DO370_PREFLIGHT_TTL", TTL)
+    preflight = _Stage(items, timeout, ttl)
+    for index, item in enumerate(items):
+        item["task"] = preflight.task(index)
+    return items
@@ -0,0 +1,192 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Termination-aware lifecycle of the lab projects.
+
+Deleting a Project only starts the deletion: the namespace stays in the
+Terminating phase until every object in it is gone, which takes a while when
+PVCs, VolumeSnapshots or ObjectBucketClaims have to be released first. A
+start that runs in the meantime used to fail because the project "exists".
+
+delete() removes the project and, unless told otherwise, watches the
+namespace until it is gone. wait_gone() lets a start wait for a Terminating
+namespace instead of failing. Both log their progress while waiting and
+report the finalizers that hold the deletion when the deadline expires.
+
+Environment variables:
+
+    DO370_TEARDOWN_TIMEOUT   deadline in seconds (120), shared with teardown
+"""
+
+import time
+import logging
+
+from do370.common import settings, teardown
+
+# Seconds between two progress reports while waiting
+PROGRESS_INTERVAL = 10
+
+# Namespaced kinds whose finalizers commonly delay a namespace deletion
+FINALIZED_KINDS = [
+    ("v1", "PersistentVolumeClaim"),
+    ("snapshot.storage.k8s.io/v1", "VolumeSnapshot"),
+    ("objectbucket.io/v1alpha1", "ObjectBucketClaim"),
+    ("v1", "Pod"),
+]
+
+# Namespace conditions that explain why the deletion is not complete
+_CONDITIONS = ("NamespaceContentRemaining", "NamespaceFinalizersRemaining")
+
+
+def _namespace(oc_client):
+    return oc_client.resources.get(api_version="v1", kind="Namespace")
+
+
+def _get(resource, **kwargs):
+    try:
+        return resource.get(**kwargs).to_dict()
+    except Exception as e:
+        if e.__class__.__name__ == "NotFoundError":
+            return None
+        raise
+
+
+def blockers(oc_client, name):
+    """
+    Return human readable reasons why the namespace is still terminating
+    """
+    reasons = []
+    namespace = _get(_namespace(oc_client), name=name)
+    if namespace is None:
+        return reasons
+    for condition in namespace.get("status", {}).get("conditions") or []:
+        if condition.get("type") in _CONDITIONS and condition.get("status") == "True":
+            reasons.append(condition.get("message"))
+
+    for api_version, kind in FINALIZED_KINDS:
+        try:
+            resource = oc_client.resources.get(api_version=api_version, kind=kind)
+            objects = resource.get(namespace=name).to_dict()["items"]
+        except Exception as e:
+            logging.debug("Could not list {}: {}".format(kind, e))
+            continue
+        for obj in objects:
+            finalizers = obj["metadata"].get("finalizers")
+            if finalizers:
+                reasons.append("{}/{} has finalizers {}".format(
+                    kind, obj["metadata"]["name"], ", ".join(finalizers)))
+
+    # Snapshot contents are cluster scoped but point back to the namespace
+    try:
+        resource = oc_client.resources.get(
+            api_version="snapshot.storage.k8s.io/v1", kind="VolumeSnapshotContent"
+        )
+        for obj in resource.get().to_dict()["items"]:
+            ref = obj.get("spec", {}).get("volumeSnapshotRef") or {}
+            finalizers = obj["metadata"].get("finalizers")
+            if ref.get("namespace") == name and finalizers:
+                reasons.append("VolumeSnapshotContent/{} has finalizers {}".format(
+                    obj["metadata"]["name"], ", ".join(finalizers)))
+    except Exception as e:
+        logging.debug("Could not list VolumeSnapshotContent: {}".format(e))
+    return reasons
+
+
+def _wait(oc_client, name, timeout):
+    """
+    Watch the namespace until it is gone, return True if it is
+    """
+    resource = _namespace(oc_client)
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        step = min(deadline, time.monotonic() + PROGRESS_INTERVAL)
+        if not teardown.wait_gone(oc_client, resource, None, [name], step):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        reasons = blockers(oc_client, name)
+        logging.info("Namespace {} still terminating after {:.0f}s{}".format(
+            name, time.monotonic() - start,
+            ": " + "; ".join(reasons) if reasons else ""))
+
+
+def _timeout(timeout):
+    if timeout is None:
+        timeout = settings.integer(
+            "DO370_TEARDOWN_TIMEOUT", teardown.DEADLINE, minimum=1
+        )
+    return timeout
+
+
+def delete(oc_client, name, wait=True, timeout=None):
+    """
+    Delete the project name.
+
+    Return a dictionary with the status ("absent", "deleting", "deleted" or
+    "timeout"), the seconds spent and, on timeout, the blockers.
+    """
+    start = time.monotonic()
+    result = {"status": "deleting", "seconds": 0.0, "blockers": []}
+    resource = oc_client.resources.get(
+        api_version="project.openshift.io/v1", kind="Project"
+    )
+    logging.info("Delete project/{}".format(name))
+    try:
+        resource.delete(name=name)
+    except Exception as e:
+        if e.__class__.__name__ != "NotFoundError":
+            raise
+        logging.info("Project/{} was not found".format(name))
+        result["status"] = "absent"
+    if wait:
+        if _wait(oc_client, name, _timeout(timeout)):
+            if result["status"] == "deleting":
+                result["status"] = "deleted"
+        else:
+            result["status"] = "timeout"
+            result["blockers"] = blockers(oc_client, name)
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def wait_gone(oc_client, name, timeout=None):
+    """
+    Wait for a Terminating namespace to disappear.
+
+    Return a dictionary with the status ("absent", "present" when the
+    namespace exists and is not terminating, or "timeout"), the seconds
+    spent and, on timeout, the blockers.
+    """
+    start = time.monotonic()
+    result = {"status": "absent", "seconds": 0.0, "blockers": []}
+    namespace = _get(_namespace(oc_client), name=name)
+    if namespace is not None:
+        if namespace.get("status", {}).get("phase") != "Terminating":
+            result["status"] = "present"
+        elif not _wait(oc_client, name, _timeout(timeout)):
+            result["status"] = "timeout"
+            result["blockers"] = blockers(oc_client, name)
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def report(name, result):
+    """
+    Return Console messages describing a delete() or wait_gone() result
+    """
+    msgs = []
+    if result["status"] == "timeout":
+        msgs.append({"text": "Project {} is still terminating after {:.0f}s".format(
+            name, result["seconds"])})
+        msgs.extend({"text": reason} for reason in result["blockers"])
+    elif result["status"] in ("deleted", "absent") and result["seconds"] >= 1:
+        msgs.append({"text": "Waited {:.0f}s for project {} to terminate".format(
+            result["seconds"], name)})
+    for msg in msgs:
+        logging.info(msg["text"])
+    return msgs
@@ -0,0 +1,100 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Cheap cluster readiness check for the DO370 lab scripts.
+
+The "Cluster Ready" item of the labs listed every Project, Node and Namespace
+of the cluster to prove that the API answers, then every ClusterVersion. On a
+shared training cluster with hundreds of namespaces, that is megabytes of
+JSON on every start.
+
+check() asks the API server for /readyz, lists at most one Node and one
+Namespace as metadata only, reads the discovery document of the OpenShift
+project API, which is served by openshift-apiserver, and gets the
+ClusterVersion named "version". A successful result is kept for the rest of
+the process, so every lab item that needs a ready cluster pays for it once.
+"""
+
+import logging
+import threading
+
+from kubernetes.client.rest import ApiException
+
+from do370.common import existence
+
+# Proof that the API server and its aggregated OpenShift APIs answer
+_PROBES = [
+    ("/api/v1/nodes", existence.METADATA_LIST, {"limit": 1}),
+    ("/api/v1/namespaces", existence.METADATA_LIST, {"limit": 1}),
+    ("/apis/project.openshift.io/v1", "application/json", {}),
+]
+
+_ready = {}
+_lock = threading.Lock()
+
+
+def _get(api_client, path, accept="application/json", query=None):
+    return api_client.call_api(
+        path, "GET",
+        query_params=list((query or {}).items()),
+        header_params={"Accept": accept},
+        auth_settings=["BearerToken"],
+        response_type="object",
+        _return_http_data_only=True,
+    )
+
+
+def _readyz(api_client):
+    try:
+        _get(api_client, "/readyz", accept="text/plain")
+    except ApiException as e:
+        if e.status != 404:
+            raise
+        # API servers older than Kubernetes 1.16 only serve /healthz
+        _get(api_client, "/healthz", accept="text/plain")
+
+
+def _probe(api_client):
+    """
+    Return None when the cluster is ready, or the reason why it is not
+    """
+    try:
+        _readyz(api_client)
+        for path, accept, query in _PROBES:
+            _get(api_client, path, accept=accept, query=query)
+    except Exception as e:
+        logging.debug("API is not ready: {}: {}".format(e.__class__.__name__, e))
+        return "API is not ready"
+    try:
+        cluster_version = _get(
+            api_client, "/apis/config.openshift.io/v1/clusterversions/version"
+        )
+    except Exception as e:
+        logging.debug("Could not read the ClusterVersion: {}".format(e))
+        return "Cluster is not OpenShift"
+    if not (cluster_version.get("spec") or {}).get("clusterID"):
+        return "Cluster ID could not be found"
+    return None
+
+
+def check(oc_client, item):
+    """
+    Item task that fails unless the cluster oc_client talks to is ready
+    """
+    api_client = oc_client.client
+    key = api_client.configuration.host
+    with _lock:
+        ready = _ready.get(key, False)
+    reason = None if ready else _probe(api_client)
+    if reason is None:
+        with _lock:
+            _ready[key] = True
+        item["failed"] = False
+    else:
+        item["failed"] = True
+        item["msgs"] = [{"text": reason}]
+    return item["failed"]
@@ -0,0 +1,145 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Declarative, batched grading rules.
+
+A rule is a Console item without a task:
+
+    {
+        "label": "Check storage class of the \"mariadb\" PVC",
+        "api": "v1",
+        "kind": "PersistentVolumeClaim",
+        "namespace": "workloads-review",
+        "name": "mariadb",
+        "field": "spec.storageClassName",             # optional
+        "expected": "ocs-storagecluster-ceph-rbd",    # with "field"
+        "message": "The storage class of mariadb is incorrect. "
+                   "Please work through the lab instructions",
+        "missing": "PVC mariadb does not exist. "     # optional
+                   "Please work through the lab instructions",
+        "fatal": True,
+    }
+
+A rule without "field" only checks that the object exists. "field" is a
+dotted path that accepts list indexes, such as
+"spec.template.spec.volumes[0].persistentVolumeClaim.claimName", and
+"message" is the text students see when it does not hold the expected value.
+"missing" replaces the default text shown when the object does not exist.
+Rules without "namespace" are for cluster-scoped kinds.
+
+Evaluator takes a snapshot.Snapshot of the objects of every rule the first
+time any rule runs, and evaluates every rule against it. Each rule is still
+rendered as its own Console line. A kind that cannot be listed only fails
+the rules of that kind, in that namespace.
+"""
+
+import re
+import threading
+
+from do370.common import snapshot
+
+_MISSING = object()
+
+
+def lookup(obj, field):
+    """
+    Return the value of a dotted field path in obj, or _MISSING
+    """
+    value = obj
+    for part in re.findall(r"[^.\[\]]+|\[\d+\]", field.lstrip(".")):
+        try:
+            if part.startswith("["):
+                value = value[int(part[1:-1])]
+            else:
+                value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return _MISSING
+    return value
+
+
+class Evaluator:
+    """
+    Turn rules into Console items that share one snapshot of the cluster
+    """
+
+    def __init__(self, oc_client, rules, workers=None):
+        self.oc_client = oc_client
+        self.rules = rules
+        self.workers = workers
+        self.groups = {}
+        for rule in rules:
+            self.groups.setdefault(rule.get("namespace") or None, []).append(rule)
+        # Cluster-scoped kinds are listed along with the first namespace
+        if len(self.groups) > 1 and None in self.groups:
+            cluster = self.groups.pop(None)
+            self.groups[next(iter(self.groups))].extend(cluster)
+        self.snapshots = None
+        self.lock = threading.Lock()
+
+    def items(self):
+        group_of = {
+            id(rule): namespace
+            for namespace, rules in self.groups.items() for rule in rules
+        }
+        items = []
+        for rule in self.rules:
+            item = dict(rule)
+            item["task"] = self._task(group_of[id(rule)])
+            items.append(item)
+        return items
+
+    def _prefetch(self):
+        with self.lock:
+            if self.snapshots is not None:
+                return
+            snapshots = {}
+            for namespace, rules in self.groups.items():
+                kinds = []
+                names = {}
+                for rule in rules:
+                    if (rule["api"], rule["kind"]) not in kinds:
+                        kinds.append((rule["api"], rule["kind"]))
+                    names.setdefault(rule["kind"], set()).add(rule["name"])
+                snapshots[namespace] = snapshot.Snapshot(
+                    self.oc_client, namespace, kinds,
+                    workers=self.workers, names=names, raise_errors=False,
+                )
+            self.snapshots = snapshots
+
+    def _task(self, namespace):
+        def check(item):
+            self._prefetch()
+            return self._check(item, namespace)
+        return check
+
+    def _check(self, item, namespace):
+        item["failed"] = False
+        objects = self.snapshots[namespace]
+        error = objects.errors.get(item["kind"])
+        if error is not None:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not get {} resources".format(item["kind"])}]
+            item["exception"] = {
+                "name": error.__class__.__name__,
+                "message": str(error),
+            }
+            return item["failed"]
+
+        if not objects.exists(item["kind"], item["name"]):
+            item["failed"] = True
+            item["msgs"] = [{"text": item.get("missing") or (
+                "The %s %s does not exist, " % (item["name"], item["kind"]) +
+                "please work through the lab instructions")}]
+        elif "field" in item:
+            value = lookup(objects.get(item["kind"], item["name"]), item["field"])
+            if value is _MISSING or value != item["expected"]:
+                item["failed"] = True
+                item["msgs"] = [{"text": item.get("message") or (
+                    "The %s %s is not configured as expected, " % (
+                        item["name"], item["kind"]) +
+                    "please work through the lab instructions")}]
+        return item["failed"]
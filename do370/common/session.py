@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Process-wide, pooled API session for the DO370 lab scripts.
+
+Every lab object builds its own Kubernetes ApiClient, whose urllib3 pool
+keeps a handful of connections and drops the extra ones, so items running in
+parallel keep opening new TLS connections. shared() returns one ApiClient
+per cluster and set of credentials for the whole process, with a connection
+pool sized for the concurrent executors and TCP keep-alive enabled on its
+sockets. use() puts the dynamic client of a lab on it.
+
+API discovery is left to the LazyDiscoverer of the dynamic client. It keeps
+the resources of the groups the labs used in one file per API host in the
+temporary directory, shared by every lab, and discovers again when a kind
+lookup misses. Keying the cache by cluster ID would need a request before
+any lookup, for a difference that only matters when a cluster is rebuilt
+behind the same API host.
+
+workers() returns the number of concurrent requests the executors make.
+
+Environment variables:
+
+    DO370_POOL_SIZE   connections kept per host (32)
+    DO370_WORKERS     concurrent requests per executor (8)
+"""
+
+import socket
+import logging
+import threading
+
+from do370.common import settings
+
+# Default number of connections kept per host
+POOL_SIZE = 32
+
+# Default number of concurrent requests per executor
+MAX_WORKERS = 8
+
+# TCP keep-alive: first probe after 30s idle, then every 10s, 3 probes
+_KEEPALIVE = (
+    ("TCP_KEEPIDLE", 30),
+    ("TCP_KEEPINTVL", 10),
+    ("TCP_KEEPCNT", 3),
+)
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _socket_options():
+    from urllib3.connection import HTTPConnection
+
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in _KEEPALIVE:
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+def _key(configuration):
+    return (
+        configuration.host,
+        configuration.verify_ssl,
+        configuration.ssl_ca_cert,
+        configuration.cert_file,
+        configuration.key_file,
+        tuple(sorted((configuration.api_key or {}).items())),
+    )
+
+
+def shared(api_client, pool_size=None):
+    """
+    Return the process-wide ApiClient for the cluster and credentials of
+    api_client. The first client seen for them becomes the shared one, with
+    its pool resized and keep-alive enabled.
+    """
+    if pool_size is None:
+        pool_size = settings.integer("DO370_POOL_SIZE", POOL_SIZE, minimum=1)
+    key = _key(api_client.configuration)
+    with _lock:
+        if key in _sessions:
+            return _sessions[key]
+        configuration = api_client.configuration
+        configuration.connection_pool_maxsize = max(1, pool_size)
+        # Only honored by the clients that support it
+        configuration.socket_options = _socket_options()
+        api_client.rest_client = type(api_client.rest_client)(configuration)
+        logging.debug("Shared API session for {} with {} connections".format(
+            configuration.host, configuration.connection_pool_maxsize))
+        _sessions[key] = api_client
+        return api_client
+
+
+def use(lab):
+    """
+    Point lab.oc_client at the shared ApiClient. The dynamic client is kept,
+    with the discovery data it already loaded, so no request is made. Keeps
+    the current ApiClient on any error.
+    """
+    try:
+        api_client = shared(lab.oc_client.client)
+        lab.oc_client.client = api_client
+        lab.oc_client.configuration = api_client.configuration
+    except Exception as e:
+        logging.debug(
+            "Shared API session disabled: {}: {}".format(e.__class__.__name__, e)
+        )
+
+
+def workers(default=MAX_WORKERS):
+    """
+    Return the number of concurrent requests: DO370_WORKERS when it is a
+    positive integer, default otherwise
+    """
+    return settings.integer("DO370_WORKERS", default, minimum=1)
@@ -0,0 +1,42 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Numeric settings of the DO370 lab scripts read from environment variables.
+
+A malformed value must not stop a lab halfway through, so integer() logs a
+warning, once per variable and value, and returns the default instead of
+raising ValueError.
+"""
+
+import os
+import logging
+import threading
+
+_warned = set()
+_lock = threading.Lock()
+
+
+def integer(name, default, minimum=0):
+    """
+    Return the environment variable name as an integer of at least minimum,
+    or default when it is unset or invalid
+    """
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is not None and number >= minimum:
+        return number
+    with _lock:
+        if (name, value) not in _warned:
+            _warned.add((name, value))
+            logging.warning("Ignoring {}={!r}: not an integer of at least {}".format(
+                name, value, minimum))
+    return default
@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+In-memory snapshot of the objects a grading check needs.
+
+Grading tasks used to GET every checked object separately. Snapshot lists
+each requested kind once, concurrently, and indexes the results by name, so
+the number of API calls depends on the number of kinds rather than on the
+number of checked objects. Cluster-scoped kinds are listed cluster wide.
+When only one object of a kind is needed, the LIST selects it by name.
+
+A kind that cannot be listed makes the constructor raise, unless
+raise_errors is False: the error is then kept in the errors dictionary and
+only the checks of that kind fail.
+"""
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from do370.common import session
+
+
+class NotFoundError(Exception):
+    """
+    Raised when the snapshot does not contain the requested object
+    """
+
+
+class Snapshot:
+    """
+    Objects of several kinds in one namespace, indexed by kind and name
+    """
+
+    def __init__(self, oc_client, namespace, kinds, workers=None, names=None,
+                 raise_errors=True):
+        """
+        kinds is a list of (api_version, kind) tuples, names an optional
+        {kind: set of names} of the objects the caller needs
+        """
+        if workers is None:
+            workers = session.workers()
+        self.namespace = namespace
+        self.objects = {}
+        self.errors = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                kind: pool.submit(
+                    self._list, oc_client, api_version, kind,
+                    (names or {}).get(kind),
+                )
+                for api_version, kind in kinds
+            }
+            for kind, future in futures.items():
+                try:
+                    self.objects[kind] = future.result()
+                except Exception as e:
+                    if raise_errors:
+                        raise
+                    logging.debug("Could not list {}: {}".format(kind, e))
+                    self.errors[kind] = e
+
+    def _list(self, oc_client, api_version, kind, names=None):
+        resource = oc_client.resources.get(api_version=api_version, kind=kind)
+        namespace = self.namespace if resource.namespaced else None
+        field_selector = None
+        if names is not None and len(names) == 1:
+            field_selector = "metadata.name={}".format(next(iter(names)))
+        logging.info("List {} in {}".format(kind, namespace or "cluster"))
+        listing = resource.get(
+            namespace=namespace, field_selector=field_selector
+        ).to_dict()
+        return {obj["metadata"]["name"]: obj for obj in listing["items"]}
+
+    def get(self, kind, name):
+        """
+        Return the object as a dictionary, or raise NotFoundError, or the
+        error of a kind that could not be listed
+        """
+        if kind in self.errors:
+            raise self.errors[kind]
+        try:
+            return self.objects[kind][name]
+        except KeyError:
+            raise NotFoundError("{}/{} not found".format(kind, name))
+
+    def exists(self, kind, name):
+        if kind in self.errors:
+            raise self.errors[kind]
+        return name in self.objects.get(kind, {})
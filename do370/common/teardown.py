@@ -0,0 +1,190 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Parallel, watch-confirmed teardown engine for lab resources.
+
+The lab scripts delete the documents of a resources file one at a time and
+return as soon as the API accepted the requests, so a quick finish followed by
+a start races against objects that are still terminating. delete() sends all
+the deletions concurrently with the requested propagation policy, then opens
+one watch per kind and namespace to confirm that every object is gone. The
+whole operation is bounded by a single deadline.
+
+Environment variables:
+
+    DO370_TEARDOWN_TIMEOUT   overall deadline in seconds (120)
+"""
+
+import math
+import time
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from do370.common import manifests, session, settings
+
+# Default overall deadline, in seconds
+DEADLINE = 120
+
+
+def _result(element, namespace, status, error=None):
+    return {
+        "kind": element["kind"],
+        "name": element["metadata"]["name"],
+        "namespace": namespace,
+        "status": status,
+        "error": error,
+    }
+
+
+def _error(e):
+    return {"name": e.__class__.__name__, "message": str(e)}
+
+
+def _delete_one(resource, element, namespace, propagation):
+    name = element["metadata"]["name"]
+    logging.info("Delete {}/{}".format(element["kind"], name))
+    try:
+        resource.delete(
+            name=name,
+            namespace=namespace,
+            body={
+                "apiVersion": "v1",
+                "kind": "DeleteOptions",
+                "propagationPolicy": propagation,
+            },
+        )
+        return "deleting"
+    except Exception as e:
+        if e.__class__.__name__ == "NotFoundError":
+            logging.info("Resource was not found")
+            return "absent"
+        raise
+
+
+def wait_gone(oc_client, resource, namespace, names, deadline):
+    """
+    Watch one kind in one namespace until every name in names is deleted.
+    Return the set of names that are still present when the deadline hits.
+    """
+    remaining = set(names)
+    # A single object is watched through a field selector
+    field_selector = None
+    if len(remaining) == 1:
+        field_selector = "metadata.name={}".format(names[0])
+    while remaining:
+        # Start from a LIST so deletions that already happened are not missed
+        listing = resource.get(namespace=namespace, field_selector=field_selector)
+        present = {obj.metadata.name for obj in listing.items}
+        remaining &= present
+        if not remaining:
+            break
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            for event in oc_client.watch(
+                resource,
+                namespace=namespace,
+                field_selector=field_selector,
+                resource_version=listing.metadata.resourceVersion,
+                timeout=math.ceil(timeout),
+            ):
+                if event["type"] == "DELETED":
+                    remaining.discard(event["object"].metadata.name)
+                    if not remaining:
+                        break
+                elif event["type"] == "ERROR":
+                    # resourceVersion expired, list again
+                    break
+        except Exception as e:
+            logging.debug("Watch {} failed: {}".format(resource.kind, e))
+            time.sleep(1)
+    return remaining
+
+
+def delete(oc_client, documents, namespace=None, propagation="Foreground",
+           timeout=None, workers=None):
+    """
+    Delete documents and wait until they are gone.
+
+    Return one result dictionary per document, with status "deleted",
+    "absent", "timeout" or "failed". namespace is used for namespaced
+    documents that do not declare one.
+    """
+    if timeout is None:
+        timeout = settings.integer("DO370_TEARDOWN_TIMEOUT", DEADLINE, minimum=1)
+    if workers is None:
+        workers = session.workers()
+    deadline = time.monotonic() + timeout
+
+    results = [None] * len(documents)
+    targets = []
+    for index, element in enumerate(documents):
+        try:
+            resource = oc_client.resources.get(
+                api_version=element["apiVersion"], kind=element["kind"]
+            )
+        except Exception as e:
+            results[index] = _result(element, None, "failed", _error(e))
+            continue
+        target = None
+        if resource.namespaced:
+            target = element["metadata"].get("namespace", namespace)
+        targets.append((index, resource, element, target))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            (index, resource, element, target,
+             pool.submit(_delete_one, resource, element, target, propagation))
+            for index, resource, element, target in targets
+        ]
+
+        # Group the accepted deletions by kind and namespace
+        groups = {}
+        for index, resource, element, target, future in futures:
+            try:
+                status = future.result()
+            except Exception as e:
+                results[index] = _result(element, target, "failed", _error(e))
+                continue
+            results[index] = _result(element, target, status)
+            if status == "deleting":
+                key = (element["apiVersion"], element["kind"], target)
+                groups.setdefault(key, (resource, []))[1].append(index)
+
+        waits = {
+            key: pool.submit(
+                wait_gone, oc_client, resource, key[2],
+                [results[index]["name"] for index in indexes], deadline,
+            )
+            for key, (resource, indexes) in groups.items()
+        }
+        for key, future in waits.items():
+            try:
+                left = future.result()
+                error = None
+            except Exception as e:
+                left = None
+                error = _error(e)
+            for index in groups[key][1]:
+                result = results[index]
+                if error is not None:
+                    result["status"] = "failed"
+                    result["error"] = error
+                elif result["name"] in left:
+                    result["status"] = "timeout"
+                else:
+                    result["status"] = "deleted"
+    return results
+
+
+def failed(results):
+    return any(result["status"] in ("failed", "timeout") for result in results)
+
+
+# Same result table as the apply engine
+report = manifests.report
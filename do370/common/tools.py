@@ -0,0 +1,147 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Offline provisioning of the Python tools used by the exercises.
+
+Some labs pip install command line tools on every start, which reaches the
+package index each time. ensure() first scans the dist-info metadata of the
+lab virtual environment and returns immediately when every requirement is
+already installed. Otherwise it builds wheels once into a content addressed
+directory under ~/.cache/do370/wheels, keyed by the hash of the requirements
+and the Python version, and installs from that directory with --no-index.
+
+Requirements are "name==version" strings. The wheel directory is keyed on
+them, so an unpinned name would keep whatever version was resolved first
+forever; ensure() rejects such requirements.
+"""
+
+import os
+import re
+import sys
+import shutil
+import hashlib
+import logging
+import tempfile
+import subprocess
+
+from do370.common import cache
+
+WHEEL_DIR = os.path.join(cache.CACHE_DIR, "wheels")
+
+# Marker written once a wheel directory is complete
+_COMPLETE = ".complete"
+
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _parse(requirement):
+    name, _, version = requirement.partition("==")
+    return _normalize(name.strip()), version.strip() or None
+
+
+def installed():
+    """
+    Return {normalized name: version} for the distributions on sys.path
+    """
+    found = {}
+    for path in sys.path:
+        try:
+            entries = os.listdir(path or ".")
+        except OSError:
+            continue
+        for entry in entries:
+            base, ext = os.path.splitext(entry)
+            if ext not in (".dist-info", ".egg-info"):
+                continue
+            name, _, version = base.partition("-")
+            # egg-info names may carry a -pyX.Y suffix
+            version = version.split("-py")[0]
+            found.setdefault(_normalize(name), version)
+    return found
+
+
+def missing(requirements):
+    """
+    Return the requirements that are not satisfied by the installed metadata
+    """
+    found = installed()
+    result = []
+    for requirement in requirements:
+        name, version = _parse(requirement)
+        if name not in found or (version and found[name] != version):
+            result.append(requirement)
+    return result
+
+
+def cache_key(requirements):
+    content = "\n".join(sorted(requirements)) + "\npy{}.{}".format(
+        *sys.version_info[:2]
+    )
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def _pip(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "pip", "-qqq", "--no-input", "--no-color"]
+        + list(args),
+        check=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def _populate(requirements):
+    """
+    Return the wheel directory for requirements, building it if needed
+    """
+    wheel_dir = os.path.join(WHEEL_DIR, cache_key(requirements))
+    if os.path.exists(os.path.join(wheel_dir, _COMPLETE)):
+        return wheel_dir
+
+    logging.info("Build wheels for {}".format(", ".join(requirements)))
+    os.makedirs(WHEEL_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=WHEEL_DIR)
+    try:
+        _pip("wheel", "--wheel-dir", tmp_dir, *requirements)
+        open(os.path.join(tmp_dir, _COMPLETE), "w").close()
+        shutil.rmtree(wheel_dir, ignore_errors=True)
+        os.rename(tmp_dir, wheel_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return wheel_dir
+
+
+def ensure(requirements):
+    """
+    Make sure requirements are installed in the running virtual environment.
+
+    Return True if something was installed, False if they were satisfied.
+    """
+    unpinned = [r for r in requirements if _parse(r)[1] is None]
+    if unpinned:
+        raise ValueError("Unpinned requirements: {}".format(", ".join(unpinned)))
+
+    needed = missing(requirements)
+    if not needed:
+        logging.info("Already installed: {}".format(", ".join(requirements)))
+        return False
+
+    wheel_dir = _populate(requirements)
+    logging.info("Install {} from {}".format(", ".join(needed), wheel_dir))
+    try:
+        _pip("install", "--no-index", "--find-links", wheel_dir, *requirements)
+    except subprocess.CalledProcessError:
+        # Incomplete or stale cache, rebuild it once
+        shutil.rmtree(wheel_dir, ignore_errors=True)
+        wheel_dir = _populate(requirements)
+        _pip("install", "--no-index", "--find-links", wheel_dir, *requirements)
+    return True
@@ -0,0 +1,218 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Chrome trace-event recording for the DO370 lab scripts.
+
+    DO370_TRACE=/tmp/start.json lab start backup-review
+
+writes a trace that chrome://tracing or https://ui.perfetto.dev can open,
+and prints the slowest items to stderr when the command exits. The trace
+contains:
+
+    item      one span per Console item, on the thread that ran its task
+    http      one span per Kubernetes API request, with status and path
+    process   one span per subprocess.run() call, and one instant event
+              per process started through subprocess.Popen
+
+Nothing is recorded unless enable() was called, which the do370 package
+does when DO370_TRACE is set.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+import functools
+import contextlib
+import subprocess
+
+from urllib.parse import urlsplit
+
+# Number of items listed in the summary
+SUMMARY_ITEMS = 10
+
+_events = []
+_lock = threading.Lock()
+_enabled = False
+_pid = os.getpid()
+
+
+def _now():
+    return time.perf_counter() * 1e6
+
+
+def _emit(event):
+    event["pid"] = _pid
+    event["tid"] = threading.get_ident()
+    with _lock:
+        _events.append(event)
+
+
+@contextlib.contextmanager
+def span(name, category, **args):
+    """
+    Record the enclosed block as a complete event. The yielded dictionary
+    can be updated with arguments known only at the end.
+    """
+    if not _enabled:
+        yield args
+        return
+    start = _now()
+    try:
+        yield args
+    finally:
+        _emit({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": _now() - start,
+            "args": args,
+        })
+
+
+def instant(name, category, **args):
+    if _enabled:
+        _emit({"name": name, "cat": category, "ph": "i", "s": "t",
+               "ts": _now(), "args": args})
+
+
+# Instrumentation
+
+def _wrap_task(task):
+    @functools.wraps(task)
+    def traced(item):
+        args = {}
+        if "playbook" in item:
+            args["playbook"] = item["playbook"]
+        with span(item.get("label", "item"), "item", **args) as span_args:
+            result = task(item)
+            span_args["failed"] = bool(
+                result if result is not None else item.get("failed", False)
+            )
+            return result
+    traced.traced = True
+    return traced
+
+
+def _instrument_console():
+    from labs.common import userinterface
+
+    init = userinterface.Console.__init__
+
+    @functools.wraps(init)
+    def traced_init(self, items, *args, **kwargs):
+        for item in items:
+            task = item.get("task")
+            if task is not None and not getattr(task, "traced", False):
+                item["task"] = _wrap_task(task)
+        init(self, items, *args, **kwargs)
+
+    userinterface.Console.__init__ = traced_init
+
+
+def _instrument_http():
+    from kubernetes.client import rest
+
+    request = rest.RESTClientObject.request
+
+    @functools.wraps(request)
+    def traced_request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        span_args = {"query": parts.query} if parts.query else {}
+        with span("{} {}".format(method, parts.path), "http", **span_args) as span_args:
+            try:
+                response = request(self, method, url, *args, **kwargs)
+            except Exception as e:
+                span_args["status"] = getattr(e, "status", None)
+                raise
+            span_args["status"] = getattr(response, "status", None)
+            return response
+
+    rest.RESTClientObject.request = traced_request
+
+
+def _instrument_subprocess():
+    run = subprocess.run
+    popen_init = subprocess.Popen.__init__
+
+    @functools.wraps(run)
+    def traced_run(args, *more, **kwargs):
+        argv = args if isinstance(args, (list, tuple)) else [args]
+        with span("run {}".format(os.path.basename(str(argv[0]))), "process",
+                  argv=[str(arg) for arg in argv]) as span_args:
+            result = run(args, *more, **kwargs)
+            span_args["returncode"] = result.returncode
+            return result
+
+    @functools.wraps(popen_init)
+    def traced_popen_init(self, args, *more, **kwargs):
+        argv = args if isinstance(args, (list, tuple)) else [args]
+        instant("exec {}".format(os.path.basename(str(argv[0]))), "process",
+                argv=[str(arg) for arg in argv])
+        popen_init(self, args, *more, **kwargs)
+
+    subprocess.run = traced_run
+    subprocess.Popen.__init__ = traced_popen_init
+
+
+# Output
+
+def summary(limit=SUMMARY_ITEMS):
+    """
+    Return the slowest item spans as (seconds, label, failed) tuples
+    """
+    with _lock:
+        items = [event for event in _events if event["cat"] == "item"]
+    items.sort(key=lambda event: event["dur"], reverse=True)
+    return [
+        (event["dur"] / 1e6, event["name"], event["args"].get("failed"))
+        for event in items[:limit]
+    ]
+
+
+def write(path):
+    with _lock:
+        events = list(_events)
+    with open(path, "w") as output_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, output_file)
+
+
+def _finish(path):
+    try:
+        write(path)
+    except OSError as e:
+        sys.stderr.write("Could not write trace {}: {}\n".format(path, e))
+        return
+    slowest = summary()
+    with _lock:
+        requests = sum(1 for event in _events if event["cat"] == "http")
+    sys.stderr.write("\nTrace written to {} ({} API requests)\n".format(path, requests))
+    if slowest:
+        sys.stderr.write("Slowest items:\n")
+        for seconds, label, failed in slowest:
+            sys.stderr.write("  {:>8.2f}s  {}{}\n".format(
+                seconds, label, "  (failed)" if failed else ""))
+
+
+def enable(path):
+    """
+    Start recording and write the trace to path when the process exits
+    """
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    for instrument in (_instrument_console, _instrument_http, _instrument_subprocess):
+        try:
+            instrument()
+        except ImportError as e:
+            logging.debug("Tracing without {}: {}".format(instrument.__name__, e))
+    atexit.register(_finish, path)
@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Garbage collection of the CSI volume snapshots of the lab namespaces.
+
+The finish of a lab used to delete the content of one snapshot with a known
+name, and every other snapshot a student took kept its Ceph RBD image until
+someone cleaned the cluster by hand. VolumeSnapshotContents are cluster
+scoped, and those with the Retain policy even outlive their namespace.
+
+delete() lists the VolumeSnapshots of the namespaces and every
+VolumeSnapshotContent that refers to them, one request per kind, switches
+retained contents to the Delete policy so that the CSI driver releases their
+backing snapshot, then deletes everything concurrently through the teardown
+engine and waits until the contents are gone.
+"""
+
+import logging
+
+from do370.common import teardown
+
+API_VERSION = "snapshot.storage.k8s.io/v1"
+
+
+def _list(oc_client, kind, namespace=None, label_selector=None):
+    resource = oc_client.resources.get(api_version=API_VERSION, kind=kind)
+    logging.info("List {} in {}".format(kind, namespace or "cluster"))
+    return resource.get(
+        namespace=namespace, label_selector=label_selector
+    ).to_dict()["items"]
+
+
+def collect(oc_client, namespaces, label_selector=None):
+    """
+    Return the VolumeSnapshots of namespaces that match label_selector, and
+    the VolumeSnapshotContents bound to them. Without a label selector, the
+    contents that still refer to a deleted snapshot of namespaces are
+    returned too.
+    """
+    namespaces = set(namespaces)
+    # A single namespace is listed directly, several with one cluster-wide list
+    scope = next(iter(namespaces)) if len(namespaces) == 1 else None
+    snapshots = [
+        obj for obj in _list(oc_client, "VolumeSnapshot", scope, label_selector)
+        if obj["metadata"].get("namespace") in namespaces
+    ]
+    bound = {
+        (obj.get("status") or {}).get("boundVolumeSnapshotContentName")
+        for obj in snapshots
+    }
+    contents = []
+    for obj in _list(oc_client, "VolumeSnapshotContent"):
+        ref = (obj.get("spec") or {}).get("volumeSnapshotRef") or {}
+        if obj["metadata"]["name"] in bound or (
+            label_selector is None and ref.get("namespace") in namespaces
+        ):
+            contents.append(obj)
+    return snapshots, contents
+
+
+def _release(oc_client, contents):
+    """
+    Switch retained contents to the Delete policy
+    """
+    resource = oc_client.resources.get(
+        api_version=API_VERSION, kind="VolumeSnapshotContent"
+    )
+    for obj in contents:
+        if (obj.get("spec") or {}).get("deletionPolicy") != "Retain":
+            continue
+        name = obj["metadata"]["name"]
+        logging.info("Patch VolumeSnapshotContent/{} deletionPolicy".format(name))
+        resource.patch(
+            {
+                "apiVersion": API_VERSION,
+                "kind": "VolumeSnapshotContent",
+                "metadata": {"name": name},
+                "spec": {"deletionPolicy": "Delete"},
+            },
+            content_type="application/merge-patch+json",
+        )
+
+
+def _document(kind, obj):
+    # Items of a list do not carry their kind
+    metadata = {"name": obj["metadata"]["name"]}
+    if obj["metadata"].get("namespace"):
+        metadata["namespace"] = obj["metadata"]["namespace"]
+    return {"apiVersion": API_VERSION, "kind": kind, "metadata": metadata}
+
+
+def delete(oc_client, namespaces, label_selector=None, timeout=None, workers=None):
+    """
+    Delete the volume snapshots of namespaces and wait until their contents
+    are released.
+
+    Return the teardown result dictionaries, one per object.
+    """
+    snapshots, contents = collect(oc_client, namespaces, label_selector)
+    logging.info("Found {} VolumeSnapshots and {} VolumeSnapshotContents".format(
+        len(snapshots), len(contents)))
+    if not snapshots and not contents:
+        return []
+    _release(oc_client, contents)
+    # Snapshots and contents are deleted together: the snapshot controller
+    # drops the bound protection of a content once its snapshot is gone
+    return teardown.delete(
+        oc_client,
+        [_document("VolumeSnapshot", obj) for obj in snapshots]
+        + [_document("VolumeSnapshotContent", obj) for obj in contents],
+        propagation="Background",
+        timeout=timeout,
+        workers=workers,
+    )
@@ -0,0 +1,165 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Watch-based readiness waits for lab resources.
+
+wait_for() lists the object once, then follows a watch stream from the
+returned resourceVersion and returns as soon as the condition holds, instead
+of polling on a fixed interval. A watch that ends or loses its connection
+resumes from the last resourceVersion seen; the object is listed again only
+when the server expired that version. Throttling and server errors are
+retried after a second, other API errors are raised.
+
+Conditions are plain functions that receive the object as a dictionary:
+
+    waits.phase("Running")        status.phase, for Pods
+    waits.bound()                 status.phase == "Bound", for PVCs and OBCs
+    waits.ready()                 Ready condition is "True"
+    waits.ready_to_use()          status.readyToUse, for VolumeSnapshots
+
+Every wait is recorded in waits.history with its duration, so slow storage
+provisioning shows up in the logs.
+"""
+
+import math
+import time
+import logging
+
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import HTTPError
+from do370.common import settings
+
+# Default timeout of a single wait, in seconds
+TIMEOUT = 300
+
+# Status of a watch whose resourceVersion the server no longer keeps
+GONE = 410
+
+# Statuses worth retrying after RETRY_DELAY seconds, others are raised
+TRANSIENT = (429, 500, 502, 503, 504)
+RETRY_DELAY = 1
+
+# One entry per completed wait: kind, name, namespace, condition, ok, seconds
+history = []
+
+
+def phase(value):
+    def check(obj):
+        return obj.get("status", {}).get("phase") == value
+    check.description = "phase={}".format(value)
+    return check
+
+
+def bound():
+    check = phase("Bound")
+    check.description = "bound"
+    return check
+
+
+def ready(condition_type="Ready"):
+    def check(obj):
+        for condition in obj.get("status", {}).get("conditions") or []:
+            if condition.get("type") == condition_type:
+                return condition.get("status") == "True"
+        return False
+    check.description = "{}=True".format(condition_type)
+    return check
+
+
+def ready_to_use():
+    def check(obj):
+        return obj.get("status", {}).get("readyToUse") is True
+    check.description = "readyToUse"
+    return check
+
+
+def _to_dict(obj):
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
+
+
+def _list(resource, name, namespace):
+    listing = resource.get(
+        namespace=namespace, field_selector="metadata.name={}".format(name)
+    )
+    objects = [_to_dict(obj) for obj in listing.items]
+    return objects, listing.metadata.resourceVersion
+
+
+def _watch(oc_client, resource, name, namespace, condition, deadline):
+    """
+    Return the object once condition(obj) holds, or None at the deadline
+    """
+    resource_version = None
+    while True:
+        try:
+            if resource_version is None:
+                objects, resource_version = _list(resource, name, namespace)
+                for obj in objects:
+                    if condition(obj):
+                        return obj
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            for event in oc_client.watch(
+                resource,
+                namespace=namespace,
+                field_selector="metadata.name={}".format(name),
+                resource_version=resource_version,
+                timeout=math.ceil(remaining),
+            ):
+                obj = event["raw_object"]
+                if event["type"] == "ERROR":
+                    raise ApiException(status=obj.get("code"), reason=obj.get("message"))
+                resource_version = obj["metadata"]["resourceVersion"]
+                if event["type"] in ("ADDED", "MODIFIED") and condition(obj):
+                    return obj
+        except ApiException as e:
+            if e.status == GONE:
+                # The server no longer keeps resource_version, list again
+                resource_version = None
+                continue
+            if e.status not in TRANSIENT:
+                raise
+            logging.debug("Watch {}/{} failed: {}".format(resource.kind, name, e))
+        except HTTPError as e:
+            # Connection lost, resume from the last resourceVersion seen
+            logging.debug("Watch {}/{} failed: {}".format(resource.kind, name, e))
+        if time.monotonic() + RETRY_DELAY >= deadline:
+            return None
+        time.sleep(RETRY_DELAY)
+
+
+def wait_for(oc_client, api_version, kind, name, namespace, condition,
+             timeout=None):
+    """
+    Wait until the named object satisfies condition.
+
+    Return the object as a dictionary, or None if the timeout expired.
+    """
+    if timeout is None:
+        timeout = settings.integer("DO370_WAIT_TIMEOUT", TIMEOUT, minimum=1)
+    description = getattr(condition, "description", condition.__name__)
+    resource = oc_client.resources.get(api_version=api_version, kind=kind)
+
+    start = time.monotonic()
+    obj = _watch(oc_client, resource, name, namespace, condition, start + timeout)
+    elapsed = time.monotonic() - start
+
+    history.append({
+        "kind": kind,
+        "name": name,
+        "namespace": namespace,
+        "condition": description,
+        "ok": obj is not None,
+        "seconds": elapsed,
+    })
+    logging.info(
+        "Waited {:.2f}s for {}/{} {}: {}".format(
+            elapsed, kind, name, description, "ok" if obj else "timeout"
+        )
+    )
+    return obj
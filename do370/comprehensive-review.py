@@ -19,7 +19,6 @@ comprehensive-review guided exercise (or lab).
 
 import os
 import sys
-import json
 
 from datetime import datetime
 from ocp import api
@@ -30,7 +29,7 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
-import pkg_resources
+from do370.common import existence, materials, odf, preflight, readiness, rules, session
 
 import logging
 
@@ -56,15 +55,12 @@ class ComprehensiveReview(OpenShift):
         "port": os.environ.get("OCP_PORT", "6443"),
     }
 
-    materials_dir = os.path.join(
-        pkg_resources.resource_filename(__name__, "materials"),
-        "labs",
-        __LAB__,
-    )
+    materials_dir = os.path.join(materials.MATERIALS_DIR, "labs", __LAB__)
 
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -74,7 +70,7 @@ class ComprehensiveReview(OpenShift):
         Prepare the system for starting the lab
         """
 
-        items = [
+        items = preflight.stage([
             {
                 "label": "Checking lab systems",
                 "task": labtools.check_host_reachable,
@@ -99,16 +95,17 @@ class ComprehensiveReview(OpenShift):
                 "task": self._start_check_cluster_ready,
                 "fatal": True,
             },
+        ]) + [
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
             },
             {
                 "label": "Project 'comprehensive-review' is not present",
-                "task": self._fail_if_exists,
+                "task": existence.absence_task(self),
                 "name": "comprehensive-review",
                 "type": "Project",
                 "api": "project.openshift.io/v1",
@@ -133,69 +130,62 @@ class ComprehensiveReview(OpenShift):
         """
         Perform evaluation steps on the system
         """
-        items = [
-            {
-                "label": "Checking lab systems",
-                "task": labtools.check_host_reachable,
-                "hosts": _targets,
-                "fatal": True,
-            },
+        checks = rules.Evaluator(self.oc_client, [
             {
                 "label": "Project 'comprehensive-review' is present",
-                "task": self._fail_if_not_exists,
-                "name": "comprehensive-review",
-                "type": "Project",
                 "api": "project.openshift.io/v1",
-                "namespace": "",
+                "kind": "Project",
+                "name": "comprehensive-review",
                 "fatal": True
             },
             {
                 "label": "Storage class 'ocs-storagecluster-ceph-rbd-xfs' is present",
-                "task": self._fail_if_not_exists,
-                "type": "StorageClass",
                 "api": "storage.k8s.io/v1",
+                "kind": "StorageClass",
                 "name": "ocs-storagecluster-ceph-rbd-xfs",
-                "namespace": "openshift-storage",
                 "fatal": True
             },
             {
                 "label": "PVC 'compreview' is present",
-                "task": self._fail_if_not_exists,
-                "type": "PersistentVolumeClaim",
                 "api": "v1",
+                "kind": "PersistentVolumeClaim",
                 "name": "compreview",
                 "namespace": "comprehensive-review",
                 "fatal": True
             },
             {
                 "label": "PVC 'compreview-file-cephfs' is present",
-                "task": self._fail_if_not_exists,
-                "type": "PersistentVolumeClaim",
                 "api": "v1",
+                "kind": "PersistentVolumeClaim",
                 "name": "compreview-file-cephfs",
                 "namespace": "comprehensive-review",
                 "fatal": True
             },
             {
                 "label": "OBC 'image-object-bucket' is present",
-                "task": self._fail_if_not_exists,
-                "type": "ObjectBucketClaim",
                 "api": "objectbucket.io/v1alpha1",
+                "kind": "ObjectBucketClaim",
                 "name": "image-object-bucket",
                 "namespace": "comprehensive-review",
                 "fatal": True
             },
             {
                 "label": "VolumeSnapshot 'pg-compreview-snapshot' is present",
-                "task": self._fail_if_not_exists,
-                "type": "VolumeSnapshot",
                 "api": "snapshot.storage.k8s.io/v1",
+                "kind": "VolumeSnapshot",
                 "name": "pg-compreview-snapshot",
                 "namespace": "comprehensive-review",
                 "fatal": True
             },
-
-        ]
+        ])
+        items = [
+            {
+                "label": "Checking lab systems",
+                "task": labtools.check_host_reachable,
+                "hosts": _targets,
+                "fatal": True,
+            },
+        ] + checks.items()
         ui = userinterface.Console(items)
         ui.run_items(action="Grading")
         ui.report_grade()
@@ -317,26 +307,7 @@ class ComprehensiveReview(OpenShift):
         return item["failed"]
 
     def _start_check_cluster_ready(self, item):
-        item["failed"] = True
-       # Get resources from cluster to check API
-        self.oc_client.resources.get(
-            api_version="project.openshift.io/v1", kind="Project"
-        ).get()
-        self.oc_client.resources.get(api_version="v1", kind="Node").get()
-        self.oc_client.resources.get(api_version="v1", kind="Namespace").get()
-
-        try:
-            v1_config = self.oc_client.resources.get(
-                api_version="config.openshift.io/v1", kind="ClusterVersion"
-            )
-            cluster_version = v1_config.get().items[0]
-            if cluster_version.spec.clusterID is None:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Cluster ID could not be found"}]
-            else:
-                item["failed"] = False
-        except Exception:
-            item["msgs"] = [{"text": "Cluster is not OpenShift"}]
+        return readiness.check(self.oc_client, item)
 
     def _start_create_template(self, item):
         item["failed"] = False
@@ -363,9 +334,7 @@ class ComprehensiveReview(OpenShift):
         Create a resource from a json file
         TODO: move this one to rht-labs-core api.py
         """
-        f = open(template_file)
-        t = json.load(f)
-        f.close()
+        t = materials.load(template_file)[0]
         res = self.oc_client.resources.get(
             api_version=api_ver, kind=kind
         )
@@ -25,6 +25,7 @@ import logging
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, session
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -54,6 +55,7 @@ class InternalCLI(OpenShift):
         logging.debug("Initializing super class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -74,13 +76,13 @@ class InternalCLI(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
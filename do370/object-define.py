@@ -19,15 +19,14 @@ object-define guided exercise.
 
 import os
 import sys
-import pkg_resources
 import logging
-import yaml
 
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, existence, manifests, materials, odf, session, teardown
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -60,6 +59,7 @@ class ObjectDefine(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -81,26 +81,27 @@ class ObjectDefine(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
             },
             {
                 "label": "Project '{}' is not present".format(NAMESPACE),
-                "task": self._fail_if_exists,
+                "converge": False,
+                "task": existence.absence_task(self),
                 "name": NAMESPACE,
                 "type": "Project",
                 "api": "project.openshift.io/v1",
@@ -125,6 +126,10 @@ class ObjectDefine(OpenShift):
                 "fatal": True,
             },
         ]
+        if manifests.converging():
+            # Keep what is already in place, see manifests.converge()
+            items = manifests.converge_items(items)
+
         logging.debug("start()=>run")
         userinterface.Console(items).run_items(action="Starting")
 
@@ -206,46 +211,20 @@ class ObjectDefine(OpenShift):
     def _start_create_resources(self, item):
         logging.debug("_start_create_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Create resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Apply resources from composite yaml file
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Creating resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Create {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    # Attempt to create the object and handle exceptions
-                    try:
-                        resp = resource.create(body=element, namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "ConflictError"):
-                            logging.info("Element already exists")
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            # Only missing or drifted objects are sent when converging
+            create = manifests.converge if manifests.converging() else manifests.apply
+            results = create(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = manifests.report(results)
+            item["failed"] = manifests.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not create resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -267,46 +246,19 @@ class ObjectDefine(OpenShift):
     def _finish_remove_resources(self, item):
         logging.debug("_finish_remove_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Delete resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Delete resources from composite yaml file and wait until
+            # they are gone
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Deleting resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Delete {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    try:
-                        resp = resource.delete(name=element["metadata"]["name"], namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "NotFoundError"):
-                            logging.info("Resource was not found")
-                            item["failed"] = False
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            results = teardown.delete(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not delete resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -27,6 +27,7 @@ from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, odf, session, tools
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -38,6 +39,10 @@ _targets = ["localhost"]
 # Default namespace for the resources
 NAMESPACE = "obc-practice"
 
+# Python tools used during the exercise. awscli 1.24 is the last release
+# line that runs on the Python 3.6 of the workstation.
+TOOLS = ["awscli==1.24.10", "awscli-plugin-endpoint==0.4"]
+
 disable_warnings(InsecureRequestWarning)
 
 # Change the class name to match your file name
@@ -59,6 +64,7 @@ class ObjectObc(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -79,19 +85,19 @@ class ObjectObc(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True,
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True,
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True,
@@ -142,23 +148,35 @@ class ObjectObc(OpenShift):
     ############################################################################
     # Start tasks
 
-    def _start_prepare_tools(self, package):
-        subprocess.run(
-            ["sudo", "dnf", "remove", "-y", "awscli"],
-            check=True,
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-
-        for package in ["awscli", "awscli-plugin-endpoint"]:
-            subprocess.run(
-                ["pip", "-qqq", "--no-input", "--no-color", "install", package],
-                check=True,
+    def _start_prepare_tools(self, item):
+        try:
+            # The RPM version of awscli shadows the one in the lab venv
+            rpm = subprocess.run(
+                ["rpm", "-q", "--quiet", "awscli"],
                 stdin=subprocess.DEVNULL,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
+            if rpm.returncode == 0:
+                subprocess.run(
+                    ["sudo", "dnf", "remove", "-y", "awscli"],
+                    check=True,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+
+            if not tools.ensure(TOOLS):
+                item["msgs"] = [{"text": "Already satisfied"}]
+            item["failed"] = False
+        except Exception as e:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not install the lab tools"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
+        return item["failed"]
 
     ############################################################################
     # Grading tasks
@@ -19,18 +19,15 @@ object-review guided exercise (or lab).
 
 import os
 import sys
-import base64
-import subprocess
-import pkg_resources
 import logging
 import json
-import yaml
 
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, executor, manifests, materials, odf, projects, s3, session, teardown
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -65,6 +62,7 @@ class ObjectReview(OpenShift):
         logging.debug("init class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -80,70 +78,80 @@ class ObjectReview(OpenShift):
         items = [
             {
                 "label": "Checking lab systems",
+                "key": "systems",
                 "task": labtools.check_host_reachable,
                 "hosts": _targets,
                 "fatal": True,
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True,
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True,
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": {"max_device_count": "1"},
                 "fatal": True,
             },
             {
                 "label": "Remove resources",
+                "converge": False,
                 "task": self._finish_remove_resources,
                 "resources_file": "s3-app-resources.yaml",
                 "fatal": True,
             },
             {
                 "label": "Project '{}' is not present".format(NAMESPACE),
-                "task": self._fail_if_exists,
-                "name": NAMESPACE,
-                "type": "Project",
-                "api": "project.openshift.io/v1",
-                "namespace": None,
+                "converge": False,
+                "key": "project_absent",
+                "task": self._start_wait_project_absent,
                 "fatal": True
             },
             {
                 "label": "Remove lab files",
+                "key": "lab_files",
+                "depends_on": ["systems"],
                 "task": labtools.delete_workdir,
                 "lab_name": self.__LAB__,
                 "fatal": True,
             },
             {
                 "label": "Copy exercise files",
+                "depends_on": ["lab_files"],
                 "task": labtools.copy_lab_files,
                 "lab_name": self.__LAB__,
                 "fatal": True,
             },
             {
                 "label": "Create project",
+                "key": "project",
+                "depends_on": ["project_absent"],
                 "task": self._start_create_project,
                 "fatal": True,
             },
             {
                 "label": "Create resources",
+                "depends_on": ["project"],
                 "task": self._start_create_resources,
                 "resources_file": "s3-app-resources.yaml",
                 "fatal": True,
             },
         ]
+        if manifests.converging():
+            # Keep what is already in place, see manifests.converge()
+            items = manifests.converge_items(items)
+
         logging.debug("start()=>run")
-        userinterface.Console(items).run_items(action="Starting")
+        executor.Console(items).run_items(action="Starting")
 
     def grade(self):
         """
@@ -176,6 +184,7 @@ class ObjectReview(OpenShift):
         items = [
             {
                 "label": "Checking lab systems",
+                "key": "systems",
                 "task": labtools.check_host_reachable,
                 "hosts": _targets,
                 "fatal": True,
@@ -193,13 +202,14 @@ class ObjectReview(OpenShift):
             },
             {
                 "label": "Remove lab files",
+                "depends_on": ["systems"],
                 "task": labtools.delete_workdir,
                 "lab_name": self.__LAB__,
                 "fatal": True,
             },
         ]
         logging.debug("finish()=>run")
-        userinterface.Console(items).run_items(action="Finishing")
+        executor.Console(items).run_items(action="Finishing")
 
     ############################################################################
     # Start tasks
@@ -244,46 +254,20 @@ class ObjectReview(OpenShift):
     def _start_create_resources(self, item):
         logging.debug("_start_create_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Create resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Apply resources from composite yaml file
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Creating resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Create {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    # Attempt to create the object and handle exceptions
-                    try:
-                        resp = resource.create(body=element, namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "ConflictError"):
-                            logging.info("Element already exists")
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            # Only missing or drifted objects are sent when converging
+            create = manifests.converge if manifests.converging() else manifests.apply
+            results = create(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = manifests.report(results)
+            item["failed"] = manifests.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not create resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -294,21 +278,33 @@ class ObjectReview(OpenShift):
             }
         return item["failed"]
 
+    def _start_wait_project_absent(self, item):
+        logging.debug("_start_wait_project_absent()")
+        item["msgs"] = []
+        try:
+            # A project deleted by a recent finish may still be terminating
+            result = projects.wait_gone(self.oc_client, NAMESPACE)
+            item["failed"] = result["status"] != "absent"
+            if result["status"] == "present":
+                item["msgs"] = [{"text":
+                    "The {} project already exists, ".format(NAMESPACE) +
+                    "please run 'lab finish {}'".format(self.__LAB__)}]
+            else:
+                item["msgs"] = projects.report(NAMESPACE, result)
+        except Exception as e:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not get the {} project".format(NAMESPACE)}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
+        return item["failed"]
+
     ############################################################################
     # Grading tasks
 
-    def _pip_install(self, package):
-        return subprocess.run(
-            ["pip", "-qqq", "--no-input", "--no-color", "install", package],
-            check=True,
-            stdin=subprocess.DEVNULL,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-
     def _grade_test(self, item):
         logging.debug("_grade_test()")
-        self._pip_install("awscli")
         try:
             # Check if the obc/object-review exists
             logging.info("Get {}/{}".format("ObjectBucketClaim", "object-review"))
@@ -357,49 +353,11 @@ class ObjectReview(OpenShift):
             # List the contents of the S3 bucket
             #
             # Check if we can access the S3 bucket and list the objects
-            # (at least one object should exist in the bucket and the prefix "prefix" should exist)
-            #
-            # This could have been implemented with a boto3 S3 client
-            # however I got the following when importing boto3
-            #	Could not find module object-review for course do370
-            #	Script object-review not in course library do370
-
-            env = os.environ.copy()
-            env.pop("LS_COLORS", None)
-            env.update(dict(configmap.data))
-            secret_data = dict(secret.data)
-
-            for element in secret_data:
-                env[element] = base64.b64decode(secret_data[element]).decode()
-            env["BUCKET_HOST"] = route.spec.host
-
-            if env["BUCKET_PORT"] == "80":
-                env["BUCKET_PROTO"] = "http"
-            else:
-                env["BUCKET_PROTO"] = "https"
-
-            result = subprocess.run(
-                [
-                    "{}/.venv/labs/bin/aws".format(os.environ["HOME"]),
-                    "s3",
-                    "ls",
-                    "s3://{}".format(env["BUCKET_NAME"]),
-                    "--endpoint-url",
-                    "{}://{}:{}".format(env["BUCKET_PROTO"], env["BUCKET_HOST"], env["BUCKET_PORT"]),
-                    "--recursive",
-                    "--summarize",
-                    "--no-verify-ssl",
-                ],
-                check=True,
-                env=env,
-                stdin=subprocess.DEVNULL,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
+            # (the listing stops after the first object)
+            bucket = s3.Bucket.from_obc(
+                dict(configmap.data), dict(secret.data), route.spec.host
             )
-            lines = result.stdout.splitlines()[-2]
-            last_word = lines.split()[-1]
-            num_objects = int(last_word)
+            num_objects = bucket.count(limit=1)
 
             # Check constraints and decide pass/fail
             if (
@@ -434,46 +392,19 @@ class ObjectReview(OpenShift):
     def _finish_remove_resources(self, item):
         logging.debug("_finish_remove_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Delete resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Delete resources from composite yaml file and wait until
+            # they are gone
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Deleting resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Delete {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    # Attempt to get the namespace from the YAML definition
-                    # defaults to "None" if it was not defined there
-                    # (for cluster wide resources)
-                    namespace = element["metadata"].get("namespace", None)
-                    try:
-                        resp = resource.delete(name=element["metadata"]["name"], namespace=namespace)
-                    except Exception as e:
-                        exception_name = e.__class__.__name__
-                        if (exception_name == "NotFoundError"):
-                            logging.info("Resource was not found")
-                            item["failed"] = False
-                        else:
-                            logging.debug(exception_name)
-                            logging.debug(str(e))
-                            raise
-
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            results = teardown.delete(
+                self.oc_client, manifests.load(resources_file)
+            )
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not delete resources"})
 
         except Exception as e:
             item["failed"] = True
@@ -488,36 +419,20 @@ class ObjectReview(OpenShift):
     def _finish_remove_project(self, item):
         logging.debug("_finish_remove_project()")
         item["msgs"] = []
-
-        for target in [NAMESPACE]:
-            try:
-                # Delete Project
-                project = {
-                    "apiVersion": "project.openshift.io/v1",
-                    "kind": "Project",
-                    "metadata": {
-                        "name": target,
-                    },
-                }
-                resource = self.oc_client.resources.get(
-                    api_version=project["apiVersion"], kind=project["kind"]
-                )
-                logging.info("Delete {}/{}".format("project", target))
-                resp = resource.delete(name=target)
-                item["failed"] = False
-
-            except Exception as e:
-                exception_name = e.__class__.__name__
-                if (exception_name == "NotFoundError"):
-                    logging.info("Resource was not found")
-                    item["failed"] = False
-                else:
-                    item["failed"] = True
-                    logging.debug("Could not delete resources")
-                    item["msgs"] = [{"text": "Could not delete resources"}]
-                    item["exception"] = {
-                        "name": exception_name,
-                        "message": str(e),
-                    }
-            item["msgs"].append({"text": "Project"})
+        try:
+            # Delete the project and wait until its namespace is gone, so
+            # that the next start does not find it terminating
+            result = projects.delete(
+                self.oc_client, NAMESPACE, wait=item.get("wait", True)
+            )
+            item["msgs"] = projects.report(NAMESPACE, result)
+            item["failed"] = False
+        except Exception as e:
+            item["failed"] = True
+            logging.debug("Could not delete resources")
+            item["msgs"] = [{"text": "Could not delete resources"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
         return item["failed"]
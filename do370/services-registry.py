@@ -27,7 +27,8 @@ import logging
 
 from ocp.utils import OpenShift
 from labs import labconfig
-from labs.common import labtools, userinterface
+from labs.common import labtools
+from do370.common import cache, executor, odf, session
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -57,6 +58,7 @@ class ServicesRegistry(OpenShift):
         logging.debug("Initializing super class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -77,19 +79,19 @@ class ServicesRegistry(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -123,7 +125,7 @@ class ServicesRegistry(OpenShift):
             },
         ]
         logging.debug("About to run the start tasks")
-        userinterface.Console(items).run_items(action="Starting")
+        executor.Console(items).run_items(action="Starting")
 
     # grade() is not implemented
 
@@ -185,4 +187,4 @@ class ServicesRegistry(OpenShift):
             #},
         ]
         logging.debug("About to run the finish tasks")
-        userinterface.Console(items).run_items(action="Finishing")
+        executor.Console(items).run_items(action="Finishing")
@@ -25,6 +25,7 @@ from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, executor, odf, session
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -62,6 +63,7 @@ class ServicesReview(OpenShift):
         logging.debug("Initializing super class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -82,19 +84,19 @@ class ServicesReview(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -127,7 +129,7 @@ class ServicesReview(OpenShift):
             },
         ]
         logging.debug("About to run the start tasks")
-        userinterface.Console(items).run_items(action="Starting")
+        executor.Console(items).run_items(action="Starting")
 
     def grade(self):
         """
@@ -185,7 +187,7 @@ class ServicesReview(OpenShift):
 
         ]
         logging.debug("About to run the finish tasks")
-        userinterface.Console(items).run_items(action="Finishing")
+        executor.Console(items).run_items(action="Finishing")
 
     ############################################################################
     # Start tasks
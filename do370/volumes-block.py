@@ -34,6 +34,7 @@ This module provides functions for: start|finish
 
 from labs.grading import Default
 from labs.common import labtools, userinterface
+from do370.common import cache
 
 # List of hosts involved in that module. Before doing anything,
 # the module checks that they can be reached on the network
@@ -64,13 +65,13 @@ class VolumesBlock(Default):
             #},
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
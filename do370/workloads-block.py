@@ -22,6 +22,7 @@ import logging
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, existence, odf, session
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -50,6 +51,7 @@ class WorkloadsClasses(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -68,19 +70,19 @@ class WorkloadsClasses(OpenShift):
             },
             {
                 "label": "Cluster operators are not progressing",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/do370-extra.yml",
                 "fatal": True
             },
             {
                 "label": "Cluster is running and users can log in",
-                "task": self.run_playbook,
+                "task": cache.playbook_task(self),
                 "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                 "fatal": True
             },
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -139,7 +141,7 @@ class WorkloadsClasses(OpenShift):
         kind = "Project"
         name = "workloads-block"
         item["failed"] = False
-        if self.resource_exists(apiVersion, kind, name, ""):
+        if existence.exists(self.oc_client, apiVersion, kind, name, ""):
             try:
                 # Delete Project
                 project = {
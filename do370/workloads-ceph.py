@@ -29,6 +29,7 @@ from kubernetes.config.config_exception import ConfigException
 from kubernetes.client.rest import ApiException
 from labs.grading import Default
 from labs.common import labtools, userinterface
+from do370.common import existence, odf, preflight, readiness, session
 
 import logging
 
@@ -53,6 +54,7 @@ class WorkloadsCeph(OpenShift):
     def __init__(self):
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -62,7 +64,7 @@ class WorkloadsCeph(OpenShift):
         Prepare the system for starting the lab
         """
 
-        items = [
+        items = preflight.stage([
             {
                 "label": "Checking lab systems",
                 "task": labtools.check_host_reachable,
@@ -87,9 +89,10 @@ class WorkloadsCeph(OpenShift):
                 "task": self._start_check_cluster_ready,
                 "fatal": True,
             },
+        ]) + [
             {
                 "label": "Installing and configuring OpenShift Data Foundation",
-                "task": self.run_playbook,
+                "task": odf.install_task(self),
                 "playbook": "ansible/install/install-lso-ocs.yml",
                 "vars": { "max_device_count": "1" },
                 "fatal": True
@@ -178,26 +181,7 @@ class WorkloadsCeph(OpenShift):
         return item["failed"]
 
     def _start_check_cluster_ready(self, item):
-        item["failed"] = True
-       # Get resources from cluster to check API
-        self.oc_client.resources.get(
-            api_version="project.openshift.io/v1", kind="Project"
-        ).get()
-        self.oc_client.resources.get(api_version="v1", kind="Node").get()
-        self.oc_client.resources.get(api_version="v1", kind="Namespace").get()
-
-        try:
-            v1_config = self.oc_client.resources.get(
-                api_version="config.openshift.io/v1", kind="ClusterVersion"
-            )
-            cluster_version = v1_config.get().items[0]
-            if cluster_version.spec.clusterID is None:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Cluster ID could not be found"}]
-            else:
-                item["failed"] = False
-        except Exception:
-            item["msgs"] = [{"text": "Cluster is not OpenShift"}]
+        return readiness.check(self.oc_client, item)
 
 
     def _check_ge_namespace(self, item):
@@ -205,7 +189,7 @@ class WorkloadsCeph(OpenShift):
         Check GE namespace
         """
         item["failed"] = False
-        if self.resource_exists("v1", "Namespace", "workloads-ceph-ge", ""):
+        if existence.exists(self.oc_client, "v1", "Namespace", "workloads-ceph-ge", ""):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The workloads-ceph-ge namespace already exists, please " +
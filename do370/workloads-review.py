@@ -23,16 +23,15 @@ workloads-review guided exercise.
 
 import os
 import sys
-import pkg_resources
 import logging
 import json
-import yaml
 
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 from ocp.utils import OpenShift
 from labs import labconfig
 from labs.common import labtools, userinterface
+from do370.common import cache, existence, manifests, materials, odf, rules, session, teardown
 
 # Course SKU
 SKU = labconfig.get_course_sku().upper()
@@ -46,9 +45,6 @@ NAMESPACE = "workloads-review"
 
 disable_warnings(InsecureRequestWarning)
 
-class GradingError(Exception):
-    pass
-
 # Change the class name to match your file name
 class WorkloadsReview(OpenShift):
     """
@@ -69,6 +65,7 @@ class WorkloadsReview(OpenShift):
         logging.debug("init class")
         try:
             super().__init__()
+            session.use(self)
         except Exception as e:
             print("Error: %s" % e)
             sys.exit(1)
@@ -81,6 +78,8 @@ class WorkloadsReview(OpenShift):
         Prepare the system for starting the lab
         """
         logging.debug("start()")
+        # The absence checks of one kind share a single LIST
+        lookup = existence.Lookup(self.oc_client)
         items = [
             {
                "label": "Checking lab systems",
@@ -90,37 +89,40 @@ class WorkloadsReview(OpenShift):
             },
             {
                "label": "Cluster operators are not progressing",
-               "task": self.run_playbook,
+               "task": cache.playbook_task(self),
                "playbook": "ansible/common/do370-extra.yml",
                "fatal": True
             },
             {
                "label": "Cluster is running and users can log in",
-               "task": self.run_playbook,
+               "task": cache.playbook_task(self),
                "playbook": "ansible/common/ocp4-is-cluster-up.yml",
                "fatal": True
             },
             {
                "label": "Installing and configuring OpenShift Data Foundation",
-               "task": self.run_playbook,
+               "task": odf.install_task(self),
                "playbook": "ansible/install/install-lso-ocs.yml",
                "vars": { "max_device_count": "1" },
                "fatal": True
             },
             {
                 "label": "Remove resources",
+                "converge": False,
                 "task": self._finish_remove_resources,
                 "resources_file": "resources.yaml",
                 "fatal": True,
             },
             {
                 "label": "Project 'workloads-review' is not present",
+                "converge": False,
                 "task": self._check_namespace,
                 "fatal": True
             },
             {
                 "label": "PVC 'mariadb' is not present",
-                "task": self._fail_if_exists,
+                "converge": False,
+                "task": existence.absence_task(self, lookup),
                 "api": "v1",
                 "type": "PersistentVolumeClaim",
                 "name": "mariadb",
@@ -129,7 +131,8 @@ class WorkloadsReview(OpenShift):
             },
             {
                 "label": "Deployment 'mariadb' is not present",
-                "task": self._fail_if_exists,
+                "converge": False,
+                "task": existence.absence_task(self, lookup),
                 "api": "apps/v1",
                 "type": "Deployment",
                 "name": "mariadb",
@@ -138,7 +141,8 @@ class WorkloadsReview(OpenShift):
             },
             {
                 "label": "PVC 'wordpress' is not present",
-                "task": self._fail_if_exists,
+                "converge": False,
+                "task": existence.absence_task(self, lookup),
                 "api": "v1",
                 "type": "PersistentVolumeClaim",
                 "name": "wordpress",
@@ -147,7 +151,8 @@ class WorkloadsReview(OpenShift):
             },
             {
                 "label": "Deployment 'wordpress' is not present",
-                "task": self._fail_if_exists,
+                "converge": False,
+                "task": existence.absence_task(self, lookup),
                 "api": "apps/v1",
                 "type": "Deployment",
                 "name": "wordpress",
@@ -167,6 +172,11 @@ class WorkloadsReview(OpenShift):
                 "fatal": True,
             },
         ]
+        if manifests.converging():
+            # Keep what is already in place, see manifests.converge()
+            items = manifests.converge_items(items)
+        lookup.expect(items)
+
         logging.debug("start()=>run")
         userinterface.Console(items).run_items(action="Starting")
 
@@ -175,89 +185,107 @@ class WorkloadsReview(OpenShift):
         Perform lab grading
         """
         logging.debug("grade()")
-        items = [
+        checks = rules.Evaluator(self.oc_client, [
             {
                 "label": "Project 'workloads-review' is present",
-                "task": self._fail_if_not_exists,
                 "api": "v1",
-                "type": "Namespace",
+                "kind": "Namespace",
                 "name": NAMESPACE,
-                "namespace": "",
                 "fatal": True
             },
             #   MariaDB
             {
                 "label": "PVC 'mariadb' is present",
-                "task": self._fail_if_not_exists,
                 "api": "v1",
-                "type": "PersistentVolumeClaim",
+                "kind": "PersistentVolumeClaim",
                 "name": "mariadb",
                 "namespace": NAMESPACE,
                 "fatal": True
             },
             {
                 "label": 'Check storage class of the "mariadb" PVC',
-                "task": self._check_pvc_class,
-                "pvc": "mariadb",
-                "class": "ocs-storagecluster-ceph-rbd",
+                "api": "v1",
+                "kind": "PersistentVolumeClaim",
+                "name": "mariadb",
                 "namespace": NAMESPACE,
+                "field": "spec.storageClassName",
+                "expected": "ocs-storagecluster-ceph-rbd",
+                "message": "The storage class of mariadb is incorrect. " +
+                    "Please work through the lab instructions",
+                "missing": "PVC mariadb does not exist. " +
+                    "Please work through the lab instructions",
                 "fatal": True
             },
             {
                 "label": "Deployment 'mariadb' is present",
-                "task": self._fail_if_not_exists,
                 "api": "apps/v1",
-                "type": "Deployment",
+                "kind": "Deployment",
                 "name": "mariadb",
                 "namespace": NAMESPACE,
                 "fatal": True
             },
             {
                 "label": "Deployment 'mariadb' uses the 'mariadb' PVC",
-                "task": self._fail_if_not_mounted,
-                "deployment": "mariadb",
-                "pvc": "mariadb",
+                "api": "apps/v1",
+                "kind": "Deployment",
+                "name": "mariadb",
                 "namespace": NAMESPACE,
+                "field": "spec.template.spec.volumes[0].persistentVolumeClaim.claimName",
+                "expected": "mariadb",
+                "message": "'mariadb' PVC is not mounted on the 'mariadb' deployment, " +
+                    "please work through the lab instructions.",
+                "missing": "'mariadb' PVC is not mounted on the 'mariadb' deployment, " +
+                    "please work through the lab instructions.",
                 "fatal": True
             },
             #   WordPress
             {
                 "label": "PVC 'wordpress' is present",
-                "task": self._fail_if_not_exists,
                 "api": "v1",
-                "type": "PersistentVolumeClaim",
+                "kind": "PersistentVolumeClaim",
                 "name": "wordpress",
                 "namespace": NAMESPACE,
                 "fatal": True
             },
             {
                 "label": 'Check storage class of the "wordpress" PVC',
-                "task": self._check_pvc_class,
-                "pvc": "wordpress",
-                "class": "ocs-storagecluster-cephfs",
+                "api": "v1",
+                "kind": "PersistentVolumeClaim",
+                "name": "wordpress",
                 "namespace": NAMESPACE,
+                "field": "spec.storageClassName",
+                "expected": "ocs-storagecluster-cephfs",
+                "message": "The storage class of wordpress is incorrect. " +
+                    "Please work through the lab instructions",
+                "missing": "PVC wordpress does not exist. " +
+                    "Please work through the lab instructions",
                 "fatal": True
             },
             {
                 "label": "Deployment 'wordpress' is present",
-                "task": self._fail_if_not_exists,
                 "api": "apps/v1",
-                "type": "Deployment",
+                "kind": "Deployment",
                 "name": "wordpress",
                 "namespace": NAMESPACE,
                 "fatal": True
             },
             {
                 "label": "Deployment 'wordpress' uses the 'wordpress' PVC",
-                "task": self._fail_if_not_mounted,
-                "deployment": "wordpress",
-                "pvc": "wordpress",
+                "api": "apps/v1",
+                "kind": "Deployment",
+                "name": "wordpress",
                 "namespace": NAMESPACE,
+                "field": "spec.template.spec.volumes[0].persistentVolumeClaim.claimName",
+                "expected": "wordpress",
+                "message": "'wordpress' PVC is not mounted on the 'wordpress' deployment, " +
+                    "please work through the lab instructions.",
+                "missing": "'wordpress' PVC is not mounted on the 'wordpress' deployment, " +
+                    "please work through the lab instructions.",
                 "fatal": True
             },
-        ]
+        ])
         logging.debug("grade()=>run")
-        ui = userinterface.Console(items)
+        ui = userinterface.Console(checks.items())
         ui.run_items(action="Grading")
         ui.report_grade()
 
@@ -322,14 +350,9 @@ class WorkloadsReview(OpenShift):
     def _start_create_resources(self, item):
         logging.debug("_start_create_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
         try:
-            # Create Project
+            # Project goes first because it is cluster scoped
             project = {
                 "apiVersion": "project.openshift.io/v1",
                 "kind": "Project",
@@ -337,44 +360,27 @@ class WorkloadsReview(OpenShift):
                     "name": NAMESPACE,
                 },
             }
-            logging.info(
-                "Create {}/{}".format(project["kind"], project["metadata"]["name"])
-            )
-            resource = self.oc_client.resources.get(
-                api_version=project["apiVersion"], kind=project["kind"]
-            )
-            resp = resource.create(body=project, namespace=None)
-            item["msgs"].append({"text": "Project"})
-            # Create resources from composite yaml file
-            resources_file = os.path.join(lab_dir, item["resources_file"])
+            # Apply resources from composite yaml file
+            resources_file = materials.path(lab_name, item["resources_file"])
             logging.info("Creating resources from: {}".format(resources_file))
-            with open(resources_file) as input_file:
-                content = input_file.read()
-                documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-                for element in documents:
-                    logging.info(
-                        "Create {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    resp = resource.create(body=element, namespace=NAMESPACE)
-            item["msgs"].append({"text": "Lab resources"})
-            item["failed"] = False
+            # Only missing or drifted objects are sent when converging
+            create = manifests.converge if manifests.converging() else manifests.apply
+            results = create(
+                self.oc_client,
+                [project] + manifests.load(resources_file),
+                namespace=NAMESPACE,
+            )
+            item["msgs"] = manifests.report(results)
+            item["failed"] = manifests.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not create resources"})
         except Exception as e:
-            exception_name = e.__class__.__name__
-            if (exception_name == "ConflictError"):
-                logging.info("Element already exists")
-                item["failed"] = False
-            else:
-                item["failed"] = True
-                item["msgs"] = [{"text": "Could not create resources"}]
-                item["exception"] = {
-                    "name": exception_name,
-                    "message": str(e),
-                }
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not create resources"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
         return item["failed"]
 
     def _check_namespace(self, item):
@@ -382,7 +388,7 @@ class WorkloadsReview(OpenShift):
         Check lab namespace
         """
         item["failed"] = False
-        if self.resource_exists("v1", "Namespace", NAMESPACE, ""):
+        if existence.exists(self.oc_client, "v1", "Namespace", NAMESPACE, ""):
             item["failed"] = True
             item["msgs"] = [{"text":
                 "The {} project already exists, please ".format(NAMESPACE) +
@@ -390,65 +396,6 @@ class WorkloadsReview(OpenShift):
                 "before starting this lab"}]
         return item["failed"]
 
-    def _fail_if_exists(self, item):
-        """
-        Check resource existence
-        """
-        item["failed"] = False
-        if self.resource_exists(item["api"], item["type"], item["name"], ""):
-            item["failed"] = True
-            item["msgs"] = [{"text":
-                "The {} {} already exists, please ".format(item["name"], item["type"]) +
-                "delete it or run 'lab finish {}' ".format(self.__LAB__) +
-                "before starting this GE"}]
-        return item["failed"]
-
-    ############################################################################
-    # Grading tasks
-
-    def _check_pvc_class(self, item):
-        try:
-            p, c, n = item["pvc"], item["class"], item["namespace"]
-            o = self.resource_get("v1", "PersistentVolumeClaim", p, n)
-            m = None
-            item["failed"] = False
-            if not o:
-                raise GradingError("PVC {} does not exist.".format(p))
-            if o.spec.storageClassName != c:
-                raise GradingError("The storage class of {} is incorrect.".format(p))
-        except GradingError as e:
-            item["failed"] = True
-            item["msgs"] = [{"text": "{} Please work through the lab instructions".format(str(e))}]
-        return item["failed"]
-
-    def _fail_if_not_exists(self, item):
-        """
-        Check resource existence
-        """
-        item["failed"] = False
-        if not self.resource_exists(item["api"], item["type"], item["name"], item["namespace"]):
-            item["failed"] = True
-            item["msgs"] = [{"text":
-                "The %s %s does not exist, " % (item["name"], item["type"]) +
-                "please work through the lab instructions "}]
-        return item["failed"]
-
-    def _fail_if_not_mounted(self, item):
-        item["failed"] = False
-        try:
-            res = self.resource_get("apps/v1", "Deployment", item["deployment"],
-                item["namespace"])
-            pvc_name = (res.spec.template.spec
-                .volumes[0].persistentVolumeClaim.claimName)
-            if pvc_name != item["pvc"]:
-                raise Exception("PVC {} does not exist.".format(pvc_name))
-        except Exception as e:
-            item["failed"] = True
-            item["msgs"] = [{"text": 
-                "'{}' PVC is not mounted on the '{}' deployment, ".format(item["pvc"], item["deployment"]) +
-                "please work through the lab instructions."}]
-        return item["failed"]
-
     ############################################################################
     # Finish tasks
 
@@ -464,44 +411,26 @@ class WorkloadsReview(OpenShift):
     def _finish_remove_resources(self, item):
         logging.debug("_finish_remove_resources()")
         lab_name = type(self).__LAB__
-        lab_dir = os.path.join(
-            pkg_resources.resource_filename(__name__, "materials"),
-            "solutions",
-            lab_name,
-        )
         item["msgs"] = []
-        item["failed"] = False
-        # Delete resources from composite yaml file
-        resources_file = os.path.join(lab_dir, item["resources_file"])
-        logging.info("Deleting resources from: {}".format(resources_file))
-        with open(resources_file) as input_file:
-            content = input_file.read()
-            documents = yaml.load_all(content, Loader=yaml.SafeLoader)
-            for element in documents:
-                try:
-                    logging.info(
-                        "Delete {}/{}".format(
-                            element["kind"], element["metadata"]["name"]
-                        )
-                    )
-                    resource = self.oc_client.resources.get(
-                        api_version=element["apiVersion"], kind=element["kind"]
-                    )
-                    if element["metadata"].get("namespace", None):
-                        resp = resource.delete(name=element["metadata"]["name"], namespace=NAMESPACE)
-                    else:
-                        resp = resource.delete(name=element["metadata"]["name"])
-                except Exception as e:
-                    exception_name = e.__class__.__name__
-                    if (exception_name == "NotFoundError"):
-                        logging.info("Resource was not found")
-                        item["failed"] = False
-                    else:
-                        item["failed"] = True
-                        item["msgs"] = [{"text": "Could not delete resources"}]
-                        item["exception"] = {
-                            "name": exception_name,
-                            "message": str(e),
-                        }
-            item["msgs"].append({"text": "Lab resources"})
+        try:
+            # Delete resources from composite yaml file and wait until
+            # they are gone
+            resources_file = materials.path(lab_name, item["resources_file"])
+            logging.info("Deleting resources from: {}".format(resources_file))
+            results = teardown.delete(
+                self.oc_client,
+                manifests.load(resources_file),
+                namespace=NAMESPACE,
+            )
+            item["msgs"] = teardown.report(results)
+            item["failed"] = teardown.failed(results)
+            if item["failed"]:
+                item["msgs"].insert(0, {"text": "Could not delete resources"})
+        except Exception as e:
+            item["failed"] = True
+            item["msgs"] = [{"text": "Could not delete resources"}]
+            item["exception"] = {
+                "name": e.__class__.__name__,
+                "message": str(e),
+            }
         return item["failed"]
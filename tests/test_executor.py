@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Tests for the scheduling of do370.common.executor
+"""
+
+import threading
+
+import pytest
+
+from concurrent.futures import CancelledError
+
+pytest.importorskip("labs.common.userinterface")
+
+from do370.common import executor
+
+# Seconds to wait for a background item before failing the test
+TIMEOUT = 10
+
+
+def _item(label, task=None, **keys):
+    item = {"label": label, "task": task or (lambda item: False)}
+    item.update(keys)
+    return item
+
+
+def _deps(nodes):
+    return [sorted(node.deps) for node in nodes]
+
+
+def test_items_without_depends_on_wait_for_every_earlier_item():
+    nodes = executor._build_graph([_item("a"), _item("b"), _item("c")])
+
+    assert _deps(nodes) == [[], [0], [0, 1]]
+    assert [node.pending for node in nodes] == [0, 1, 2]
+    assert [len(node.dependents) for node in nodes] == [2, 1, 0]
+
+
+def test_depends_on_replaces_the_implicit_dependencies():
+    nodes = executor._build_graph([
+        _item("a", key="a"),
+        _item("b", key="b", depends_on=[]),
+        _item("c", depends_on=["a"]),
+        _item("d"),
+    ])
+
+    assert _deps(nodes) == [[], [], [0], [0, 1, 2]]
+    assert [node.pending for node in nodes] == [0, 0, 1, 3]
+
+
+@pytest.mark.parametrize("items", [
+    # Unknown key
+    [_item("a", depends_on=["missing"])],
+    # Key declared after the item that depends on it
+    [_item("a", depends_on=["b"]), _item("b", key="b")],
+    # Duplicate key
+    [_item("a", key="a"), _item("b", key="a")],
+])
+def test_invalid_dependencies(items):
+    with pytest.raises(ValueError):
+        executor._build_graph(items)
+
+
+def test_fatal_failure_cancels_pending_items_only():
+    running = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def fail(item):
+        running.wait(TIMEOUT)
+        return True
+
+    def slow(item):
+        running.set()
+        release.wait(TIMEOUT)
+        return False
+
+    def record(item):
+        ran.append(item["label"])
+        return False
+
+    nodes = executor._build_graph([
+        _item("fatal", fail, key="fatal", fatal=True),
+        _item("sibling", slow, key="sibling", depends_on=[]),
+        _item("dependent", record, depends_on=["fatal"]),
+        _item("sequential", record),
+    ])
+    scheduler = executor._Scheduler(nodes, 2)
+    scheduler.start()
+    try:
+        assert nodes[0].future.result(TIMEOUT) is True
+        # The items that did not start are cancelled, as the Console sees them
+        for node in nodes[2:]:
+            with pytest.raises(CancelledError):
+                node.future.result(TIMEOUT)
+        # The sibling was running when the fatal item failed: it completes
+        assert not nodes[1].future.done()
+        release.set()
+        assert nodes[1].future.result(TIMEOUT) is False
+    finally:
+        release.set()
+        scheduler.stop()
+    assert ran == []
+
+
+def test_non_fatal_failure_keeps_running():
+    nodes = executor._build_graph([
+        _item("a", lambda item: True),
+        _item("b"),
+    ])
+    scheduler = executor._Scheduler(nodes, 2)
+    scheduler.start()
+    try:
+        assert nodes[0].future.result(TIMEOUT) is True
+        assert nodes[1].future.result(TIMEOUT) is False
+    finally:
+        scheduler.stop()
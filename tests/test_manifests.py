@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Tests for the drift detection of do370.common.manifests
+"""
+
+from do370.common import manifests
+
+SECRET = {
+    "apiVersion": "v1",
+    "kind": "Secret",
+    "metadata": {"name": "postgresql", "namespace": "backup-review"},
+    "stringData": {
+        "POSTGRES_USER": "exampleuser",
+        "POSTGRES_PASSWORD": "examplepass",
+    },
+}
+
+# SECRET as returned by the API server
+LIVE_SECRET = {
+    "apiVersion": "v1",
+    "kind": "Secret",
+    "metadata": {
+        "name": "postgresql",
+        "namespace": "backup-review",
+        "resourceVersion": "42",
+        "uid": "00000000-0000-0000-0000-000000000001",
+    },
+    "type": "Opaque",
+    "data": {
+        "POSTGRES_USER": "ZXhhbXBsZXVzZXI=",
+        "POSTGRES_PASSWORD": "ZXhhbXBsZXBhc3M=",
+    },
+}
+
+
+def test_contains_ignores_fields_that_are_not_declared():
+    assert manifests._contains({"a": 1, "b": {"c": 2, "d": 3}}, {"b": {"c": 2}})
+    assert not manifests._contains({"a": 1}, {"a": 2})
+    assert not manifests._contains({"a": 1}, {"b": 1})
+
+
+def test_contains_compares_lists_item_by_item():
+    assert manifests._contains([{"a": 1, "b": 2}], [{"a": 1}])
+    assert not manifests._contains([{"a": 1}, {"a": 2}], [{"a": 1}])
+
+
+def test_contains_accepts_numbers_returned_as_strings():
+    assert manifests._contains({"port": "8080"}, {"port": 8080})
+    assert manifests._contains({"replicas": 1}, {"replicas": "1"})
+
+
+def test_secret_with_string_data_is_not_drifted():
+    assert not manifests._drifted(SECRET, LIVE_SECRET)
+
+
+def test_secret_with_changed_string_data_is_drifted():
+    live = dict(LIVE_SECRET, data=dict(LIVE_SECRET["data"], POSTGRES_PASSWORD="b3RoZXI="))
+    assert manifests._drifted(SECRET, live)
+
+
+def test_string_data_wins_over_data():
+    element = dict(SECRET, data={"POSTGRES_USER": "b3RoZXI="})
+    assert not manifests._drifted(element, LIVE_SECRET)
+
+
+def test_metadata_only_compares_labels_and_annotations():
+    element = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": "config", "labels": {"app": "db"}},
+        "data": {"key": "value"},
+    }
+    live = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": "config", "uid": "1", "labels": {"app": "db"}},
+        "data": {"key": "value"},
+    }
+    assert not manifests._drifted(element, live)
+    live["metadata"]["labels"]["app"] = "web"
+    assert manifests._drifted(element, live)
@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Tests for do370.common.rules
+"""
+
+from do370.common import rules
+
+NAMESPACE = "workloads-review"
+
+
+class _Listing:
+    def __init__(self, items):
+        self.items = items
+
+    def to_dict(self):
+        return {"items": self.items}
+
+
+class _Resource:
+    def __init__(self, kind, items, namespaced=True):
+        self.kind = kind
+        self.items = items
+        self.namespaced = namespaced
+
+    def get(self, namespace=None, field_selector=None):
+        return _Listing(self.items)
+
+
+class _Resources:
+    def __init__(self, resources):
+        self.resources = resources
+
+    def get(self, api_version, kind):
+        if kind not in self.resources:
+            raise LookupError("{} {} is not served".format(api_version, kind))
+        return self.resources[kind]
+
+
+class _Client:
+    def __init__(self, **resources):
+        self.resources = _Resources(resources)
+
+
+def _pvc(name, storage_class):
+    return {"metadata": {"name": name}, "spec": {"storageClassName": storage_class}}
+
+
+def _rule(kind, name, **keys):
+    rule = {"label": "{} {}".format(kind, name), "api": "v1", "kind": kind,
+            "namespace": NAMESPACE, "name": name}
+    rule.update(keys)
+    return rule
+
+
+def _run(oc_client, rule_list):
+    items = rules.Evaluator(oc_client, rule_list, workers=2).items()
+    for item in items:
+        item["task"](item)
+    return items
+
+
+def test_lookup_follows_dotted_paths_and_indexes():
+    obj = {"spec": {"volumes": [{"claim": "db"}]}}
+    assert rules.lookup(obj, "spec.volumes[0].claim") == "db"
+    assert rules.lookup(obj, "spec.volumes[1].claim") is rules._MISSING
+    assert rules.lookup(obj, "spec.missing") is rules._MISSING
+
+
+def test_rules_report_missing_objects_and_wrong_fields():
+    oc_client = _Client(PersistentVolumeClaim=_Resource(
+        "PersistentVolumeClaim", [_pvc("mariadb", "gp2")]))
+    items = _run(oc_client, [
+        _rule("PersistentVolumeClaim", "mariadb",
+              field="spec.storageClassName", expected="gp2"),
+        _rule("PersistentVolumeClaim", "wordpress"),
+        _rule("PersistentVolumeClaim", "mariadb",
+              field="spec.storageClassName", expected="ocs",
+              message="The storage class of mariadb is incorrect"),
+    ])
+
+    assert [item["failed"] for item in items] == [False, True, True]
+    assert items[1]["msgs"] == [{"text":
+        "The wordpress PersistentVolumeClaim does not exist, "
+        "please work through the lab instructions"}]
+    assert items[2]["msgs"] == [{"text": "The storage class of mariadb is incorrect"}]
+
+
+def test_kind_that_cannot_be_listed_only_fails_its_rules():
+    oc_client = _Client(PersistentVolumeClaim=_Resource(
+        "PersistentVolumeClaim", [_pvc("mariadb", "gp2")]))
+    items = _run(oc_client, [
+        _rule("PersistentVolumeClaim", "mariadb"),
+        _rule("ObjectBucketClaim", "bucket"),
+    ])
+
+    assert not items[0]["failed"]
+    assert items[1]["failed"]
+    assert items[1]["msgs"] == [{"text": "Could not get ObjectBucketClaim resources"}]
+    assert items[1]["exception"]["name"] == "LookupError"
@@ -0,0 +1,37 @@
+#
+# Copyright (c) 2020 Red Hat Training <training@redhat.com>
+#
+# All rights reserved.
+# No warranty, explicit or implied, provided.
+#
+"""
+Tests for do370.common.settings
+"""
+
+import pytest
+
+from do370.common import settings
+
+NAME = "DO370_TEST_SETTING"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 120),
+    ("", 120),
+    ("30", 30),
+    ("0", 0),
+    ("-1", 120),
+    ("abc", 120),
+    ("1.5", 120),
+])
+def test_integer(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv(NAME, raising=False)
+    else:
+        monkeypatch.setenv(NAME, value)
+    assert settings.integer(NAME, 120) == expected
+
+
+def test_integer_minimum(monkeypatch):
+    monkeypatch.setenv(NAME, "0")
+    assert settings.integer(NAME, 8, minimum=1) == 8